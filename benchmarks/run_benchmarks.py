@@ -0,0 +1,313 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmark suite for the storage, payload, feature, outlier, clustering and statistics hot paths.
+
+Generates a synthetic pod at a configurable scale, times each hot path and
+emits the results as JSON so runs can be compared:
+
+    python -m benchmarks.run_benchmarks --n-series 100000 --output bench.json
+    python -m benchmarks.run_benchmarks --n-series 100000 --compare bench.json
+
+With --compare, any benchmark whose median time grew by more than
+--threshold (default 1.25x) is reported and the exit code is 1.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from timelens.storage import TSPod, TSPodBuilder
+
+
+def generate_pod(path: str,
+                 n_series: int,
+                 n_timesteps: int,
+                 n_dims: int,
+                 n_groups: int = 4,
+                 batch_size: int = 10_000,
+                 seed: int = 0) -> TSPod:
+    """
+    Builds a synthetic pod of random walks with `n_groups` shifted groups, in
+    batches, so millions of series never have to fit in memory at once.
+    """
+    rng = np.random.default_rng(seed)
+    dimension_names = [f"Sensor_{i + 1}" for i in range(n_dims)]
+    with TSPodBuilder("BenchmarkPod", path, dimension_names=dimension_names) as builder:
+        builder.set_categorical_labels("group", {g: f"Group {g + 1}" for g in range(n_groups)})
+        for start in range(0, n_series, batch_size):
+            size = min(batch_size, n_series - start)
+            groups = rng.integers(0, n_groups, size=size)
+            steps = rng.normal(size=(size, n_timesteps, n_dims)) + 0.05 * groups[:, None, None]
+            builder.add_batch(
+                np.cumsum(steps, axis=1),
+                numerical_variables={
+                    "temperature": rng.normal(20 + groups, 3.0),
+                    "pressure": rng.normal(1000.0, 10.0, size=size),
+                },
+                categorical_variables={
+                    "group": groups,
+                    "status": rng.integers(0, 3, size=size),
+                },
+            )
+        return builder.finalize()
+
+
+def load_outlier_model(n: int) -> Optional[np.ndarray]:
+    """Functional outlier model `n` as (N, T, 1) series, or None if it cannot be read."""
+    from timelens.datasets import loadFuncionalModel
+    try:
+        data = loadFuncionalModel(n)
+    except (FileNotFoundError, ImportError):
+        return None
+    return np.asarray(data, dtype=np.float64)[:, :, None]
+
+
+def time_call(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Runs `fn` `repeat` times and summarizes the wall-clock durations."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return {
+        "times_s": times,
+        "min_s": min(times),
+        "median_s": float(np.median(times)),
+        "mean_s": float(np.mean(times)),
+        "_result": result,
+    }
+
+
+class BenchmarkRunner:
+    """Collects timed benchmark results under unique names."""
+    def __init__(self, repeat: int, only: Optional[List[str]] = None):
+        self.repeat = repeat
+        self.only = only
+        self.results: List[Dict[str, Any]] = []
+
+    def run(self, name: str, fn: Callable[[], Any], repeat: Optional[int] = None,
+            **params) -> Any:
+        if self.only and not any(name.startswith(prefix) for prefix in self.only):
+            return None
+        try:
+            timing = time_call(fn, repeat or self.repeat)
+        except Exception as e:
+            print(f"❌ {name}: {e}", file=sys.stderr)
+            self.results.append({"name": name, "params": params, "error": str(e)})
+            return None
+        result = timing.pop("_result")
+        entry = {"name": name, "params": params, **timing}
+        if isinstance(result, (bytes, bytearray)):
+            entry["response_bytes"] = len(result)
+        self.results.append(entry)
+        print(f"⏱️ {name:<48} median {timing['median_s'] * 1000:10.2f} ms", file=sys.stderr)
+        return result
+
+
+def run_benchmarks(args) -> Dict[str, Any]:
+    from timelens.utils import project_mts
+    from timelens.clustering import get_clustering_result, estimate_dbscan_eps
+    from timelens.metrics import run_numerical_tests, run_categorical_tests
+    from timelens.features import extract_features
+    from timelens.outliers import compute_outlier_scores
+
+    runner = BenchmarkRunner(args.repeat, args.only)
+    workdir = tempfile.mkdtemp(prefix="timelens-bench-")
+    try:
+        pod_path = os.path.join(workdir, "bench_pod.npz")
+        start = time.perf_counter()
+        pod = generate_pod(pod_path, args.n_series, args.n_timesteps, args.n_dims, seed=args.seed)
+        print(f"📦 Generated pod {pod.shape} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        n_series = pod.shape[0]
+        in_memory = pod.data.nbytes <= args.max_in_memory_bytes
+
+        # --- Storage ---
+        if in_memory:
+            memory_pod = TSPod.load(pod_path)
+            runner.run("storage.save.compressed", lambda: memory_pod.save(os.path.join(workdir, "c.npz")))
+            runner.run("storage.save.uncompressed",
+                       lambda: memory_pod.save(os.path.join(workdir, "u.npz"), compressed=False))
+            runner.run("storage.save.uint16",
+                       lambda: memory_pod.save(os.path.join(workdir, "q.npz"), compressed=False, precision='uint16'))
+            runner.run("storage.load.memory", lambda: TSPod.load(pod_path))
+        runner.run("storage.load.mmap", lambda: TSPod.load(pod_path, mmap_mode='r'))
+
+        # --- Payload ---
+        for max_series in args.payload_sizes:
+            if max_series <= n_series:
+                runner.run(f"payload.get_data_payload.{max_series}",
+                           lambda m=max_series: pod.get_data_payload(max_series=m), max_series=max_series)
+                runner.run(f"payload.get_data_payload.compact.{max_series}",
+                           lambda m=max_series: pod.get_data_payload(max_series=m, compact=True), max_series=max_series)
+
+        # --- Projection ---
+        if in_memory:
+            runner.run("projection.project_mts", lambda: project_mts(np.asarray(pod.data)), repeat=1)
+
+        # --- Features (memory-mapped pod, so the process pool maps the file itself) ---
+        runner.run("features.extract.serial", lambda: extract_features(pod.data, n_jobs=1), repeat=1)
+        runner.run("features.extract.parallel", lambda: extract_features(pod.data), repeat=1,
+                   n_jobs=os.cpu_count())
+
+        # --- Outlier scores: the synthetic pod, then the functional outlier models ---
+        runner.run("outliers.synthetic", lambda: compute_outlier_scores(pod.data), repeat=1)
+        for model in args.outlier_models:
+            model_data = load_outlier_model(model)
+            if model_data is None:
+                print(f"ℹ️ Outlier model {model} is unavailable; skipping.", file=sys.stderr)
+                continue
+            runner.run(f"outliers.model{model}", lambda x=model_data: compute_outlier_scores(x),
+                       n_series=model_data.shape[0], n_timesteps=model_data.shape[1])
+
+        # --- Clustering (on the projection, as the /clustering endpoint receives it) ---
+        rng = np.random.default_rng(args.seed)
+        n_points = min(n_series, args.clustering_points)
+        points = pod.projection[rng.choice(n_series, n_points, replace=False)].tolist()
+        runner.run("clustering.estimate_dbscan_eps", lambda: estimate_dbscan_eps(points), n_points=n_points)
+        eps = estimate_dbscan_eps(points)
+        runner.run("clustering.kmeans", lambda: get_clustering_result(points, 'kmeans', n_clusters=4),
+                   n_points=n_points)
+        runner.run("clustering.dbscan", lambda: get_clustering_result(points, 'dbscan', eps=eps, min_samples=5),
+                   n_points=n_points)
+
+        # --- Statistics ---
+        group_labels = np.zeros(n_series, dtype=int)
+        group_labels[rng.choice(n_series, max(2, n_series // 10), replace=False)] = 1
+        temperature = pod.series_variables["temperature"]["values"]
+        status = pod.series_variables["status"]["values"]
+        runner.run("metrics.run_numerical_tests", lambda: run_numerical_tests(temperature, group_labels))
+        runner.run("metrics.run_categorical_tests", lambda: run_categorical_tests(status, group_labels))
+
+        # --- Endpoints, end to end through the Flask test client ---
+        import timelens.server as server
+        server.tspod = pod
+        client = server.app.test_client()
+        selected = np.flatnonzero(group_labels).tolist()
+
+        def post(route: str, body: Dict[str, Any]) -> bytes:
+            response = client.post(route, json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"{route} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            return response.get_data()
+
+        endpoint_bodies = {
+            "/info": {},
+            "/data": {"max_series": min(n_series, args.payload_sizes[0])},
+            "/clustering": {"data": points, "algorithm": "kmeans", "n_clusters": 4},
+            "/statistical_tests/numerical": {"values": temperature.tolist(), "group_labels": group_labels.tolist()},
+            "/statistical_tests/categorical": {"categories": status.tolist(), "group_labels": group_labels.tolist()},
+            "/statistical_tests/ranking": {"selected_indices": selected, "k": 3},
+            "/statistical_tests/temporal": {"selected_indices": selected},
+            "/summary": {"selected_indices": selected},
+            "/selection": {"shape": "rectangle", "bounds": [-1.0, -1.0, 1.0, 1.0]},
+            "/tiles": {"zoom": 0, "x": 0, "y": 0, "variable": "group"},
+            "/similarity": {"index": 0, "k": 10},
+        }
+        for route, body in endpoint_bodies.items():
+            runner.run(f"endpoint{route.replace('/', '.')}", lambda r=route, b=body: post(r, b))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "metadata": collect_metadata(args),
+        "results": runner.results,
+    }
+
+
+def collect_metadata(args) -> Dict[str, Any]:
+    """Environment and configuration, so results are only compared like for like."""
+    versions = {}
+    for package in ("numpy", "scipy", "scikit-learn", "flask"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+        "config": {
+            "n_series": args.n_series,
+            "n_timesteps": args.n_timesteps,
+            "n_dims": args.n_dims,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Returns the benchmarks whose median time grew by more than `threshold`x."""
+    baseline_medians = {r["name"]: r["median_s"] for r in baseline["results"] if "median_s" in r}
+    regressions = []
+    for result in current["results"]:
+        before = baseline_medians.get(result["name"])
+        if before and "median_s" in result and result["median_s"] > before * threshold:
+            regressions.append({
+                "name": result["name"],
+                "baseline_median_s": before,
+                "median_s": result["median_s"],
+                "ratio": result["median_s"] / before,
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timelens benchmark suite")
+    parser.add_argument("--n-series", type=int, default=10_000, help="Number of synthetic series (default: 10000)")
+    parser.add_argument("--n-timesteps", type=int, default=200, help="Timesteps per series (default: 200)")
+    parser.add_argument("--n-dims", type=int, default=5, help="Dimensions per series (default: 5)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per benchmark (default: 3)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--payload-sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="max_series values for get_data_payload (default: 100 1000 10000)")
+    parser.add_argument("--clustering-points", type=int, default=20_000,
+                        help="Maximum projection points sent to clustering (default: 20000)")
+    parser.add_argument("--outlier-models", type=int, nargs="+", default=[1, 2, 3, 4, 5, 6],
+                        help="loadFuncionalModel datasets to score, skipped if missing (default: 1-6)")
+    parser.add_argument("--max-in-memory-bytes", type=int, default=2 * 1024 ** 3,
+                        help="Skip in-memory benchmarks when the data is larger (default: 2 GiB)")
+    parser.add_argument("--only", nargs="+", help="Only run benchmarks whose name starts with these prefixes")
+    parser.add_argument("--output", help="Write the JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="Baseline JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Median slowdown ratio reported as a regression (default: 1.25)")
+    args = parser.parse_args()
+
+    # timelens reports progress with print(); keep stdout clean for the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(args)
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.threshold)
+        for regression in report["regressions"]:
+            print(f"⚠️ Regression in {regression['name']}: {regression['ratio']:.2f}x slower", file=sys.stderr)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"💾 Results written to '{args.output}'", file=sys.stderr)
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
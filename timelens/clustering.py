@@ -1,6 +1,5 @@
 # timelens/clustering.py
 import numpy as np
-from sklearn.cluster import KMeans, DBSCAN
 from typing import Dict, List, Tuple, Union
 
 
@@ -18,6 +17,8 @@ def perform_kmeans(data: np.ndarray, n_clusters: int = 3, random_state: int = 42
         - 'values': List of cluster labels (integers)
         - 'labels': Dictionary mapping cluster IDs to human-readable names
     """
+    from sklearn.cluster import KMeans
+
     if data.shape[0] < n_clusters:
         raise ValueError(f"Number of data points ({data.shape[0]}) must be >= n_clusters ({n_clusters})")
     
@@ -49,6 +50,8 @@ def perform_dbscan(data: np.ndarray, eps: float = 0.5, min_samples: int = 5) ->
         - 'values': List of cluster labels (integers, -1 for outliers)
         - 'labels': Dictionary mapping cluster IDs to human-readable names
     """
+    from sklearn.cluster import DBSCAN
+
     dbscan = DBSCAN(eps=eps, min_samples=min_samples)
     cluster_labels = dbscan.fit_predict(data)
     
@@ -1,10 +1,28 @@
-import pandas as pd
 import numpy as np
 import os
+import hashlib
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 
-from sktime.datasets import load_from_tsfile
+from timelens.storage import TSPod
+
+
+# pandas and sktime take seconds to import, so they are only loaded on first use
+def load_from_tsfile(*args, **kwargs):
+    from sktime.datasets import load_from_tsfile as _load_from_tsfile
+    return _load_from_tsfile(*args, **kwargs)
+
+
+# Train/test .ts files of the bundled archives, relative to the repository root
+TS_DATASETS = {
+    'Wafer': ('datasets/Wafer/Wafer_TRAIN.ts', 'datasets/Wafer/Wafer_TEST.ts'),
+    'NATOPS': ('datasets/NATOPS/NATOPS_TRAIN.ts', 'datasets/NATOPS/NATOPS_TEST.ts'),
+    'SelfRegulationSCP2': ('datasets/SelfRegulationSCP2/SelfRegulationSCP2_TRAIN.ts',
+                           'datasets/SelfRegulationSCP2/SelfRegulationSCP2_TEST.ts'),
+}
 
 def loadFuncionalModel(n):
+    import pandas as pd
     dirname = os.path.dirname(__file__)
     dirname = os.path.abspath(os.path.join(dirname, os.pardir))
     df = pd.read_csv(os.path.join(dirname,'datasets/outliers/model{}.csv'.format(n)))
@@ -17,8 +35,8 @@ def loadWafer():
     X_train, y_train = load_from_tsfile(os.path.join(dirname, 'datasets/Wafer/Wafer_TRAIN.ts'), return_data_type="numpy3d")
     X_test, y_test = load_from_tsfile(os.path.join(dirname,'datasets/Wafer/Wafer_TEST.ts'), return_data_type="numpy3d")
     
-    y_train = np.array([int(y_train[i]) for i in range(len(y_train))])
-    y_test = np.array([int(y_test[i]) for i in range(len(y_test))])
+    y_train = np.asarray(y_train).astype(int)
+    y_test = np.asarray(y_test).astype(int)
     
     return X_train, y_train, X_test, y_test
 
@@ -46,4 +64,85 @@ def loadSelfRegulationSCP2():
     X_train, y_train = load_from_tsfile(os.path.join(dirname, 'datasets/SelfRegulationSCP2/SelfRegulationSCP2_TRAIN.ts'), return_data_type="numpy3d")
     X_test, y_test = load_from_tsfile(os.path.join(dirname,'datasets/SelfRegulationSCP2/SelfRegulationSCP2_TEST.ts'), return_data_type="numpy3d")
     
-    return X_train, y_train, X_test, y_test
\ No newline at end of file
+    return X_train, y_train, X_test, y_test
+
+
+def _parse_tsfile(path):
+    # Module-level so it can run in a worker process
+    return load_from_tsfile(path, return_data_type="numpy3d")
+
+
+def _source_key(paths, split_names, dimension_names):
+    # Cache key from each source file's path, size and modification time, plus
+    # the names stored in the pod
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    digest.update(repr((list(split_names), None if dimension_names is None else list(dimension_names))).encode())
+    return digest.hexdigest()[:16]
+
+
+# Builds a TSPod from one or more .ts files (e.g. train and test splits).
+#
+# Files are parsed in parallel worker processes, the NxDxT output is transposed
+# once to TSPod's NxTxD layout, class labels become the categorical variable
+# `label` and the originating file becomes `split`. The pod is cached uncompressed
+# in `cache_dir`, keyed by the source files' size and mtime and the split and
+# dimension names, so later calls load the binary pod (memory-mapped if
+# `mmap_mode` is given) instead of re-parsing. The cache file is written under a
+# unique temporary name and renamed into place, so interrupted or concurrent
+# builds never leave a truncated pod behind.
+def buildPodFromTsFiles(name, paths, cache_dir, split_names=None, dimension_names=None, n_jobs=None, mmap_mode=None):
+    paths = list(paths)
+    if split_names is None:
+        split_names = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    if len(split_names) != len(paths):
+        raise ValueError("`split_names` must have one name per path.")
+
+    cache_path = os.path.join(cache_dir, '{}-{}.npz'.format(name, _source_key(paths, split_names, dimension_names)))
+    if os.path.exists(cache_path):
+        return TSPod.load(cache_path, mmap_mode=mmap_mode)
+
+    n_workers = min(len(paths), n_jobs or os.cpu_count() or 1)
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            parsed = list(executor.map(_parse_tsfile, paths))
+    else:
+        parsed = [_parse_tsfile(p) for p in paths]
+
+    X = np.concatenate([x for x, _ in parsed], axis=0)
+    X = np.ascontiguousarray(X.transpose(0, 2, 1))
+    y = np.concatenate([np.asarray(labels) for _, labels in parsed])
+    split = np.repeat(np.arange(len(paths)), [len(labels) for _, labels in parsed])
+
+    if dimension_names is None:
+        dimension_names = ['dim_{}'.format(i) for i in range(X.shape[2])]
+    pod = TSPod(name, X, list(dimension_names))
+
+    label_values, label_codes = np.unique(y, return_inverse=True)
+    pod.add_categorical_variable('label', label_codes, {i: str(v) for i, v in enumerate(label_values)})
+    pod.add_categorical_variable('split', split, dict(enumerate(split_names)))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = '{}.{}.partial.npz'.format(cache_path[:-len('.npz')], uuid.uuid4().hex)
+    try:
+        pod.save(temp_path, compressed=False)
+        os.replace(temp_path, cache_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return pod if mmap_mode is None else TSPod.load(cache_path, mmap_mode=mmap_mode)
+
+
+# Returns one of the bundled archives (see TS_DATASETS) as a cached TSPod
+def loadDatasetPod(dataset_name, cache_dir=None, n_jobs=None, mmap_mode=None):
+    if dataset_name not in TS_DATASETS:
+        raise ValueError("Unknown dataset '{}'. Available: {}".format(dataset_name, list(TS_DATASETS)))
+    dirname = os.path.dirname(__file__)
+    dirname = os.path.abspath(os.path.join(dirname, os.pardir))
+    if cache_dir is None:
+        cache_dir = os.path.join(dirname, 'datasets', '.pod_cache')
+    paths = [os.path.join(dirname, p) for p in TS_DATASETS[dataset_name]]
+    return buildPodFromTsFiles(dataset_name, paths, cache_dir, split_names=['train', 'test'],
+                               n_jobs=n_jobs, mmap_mode=mmap_mode)
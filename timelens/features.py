@@ -0,0 +1,121 @@
+# timelens/features.py
+"""
+Vectorized per-series summary features over (N, T, D) series, extracted in
+chunks across a worker pool.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Features computed for every dimension, in column order
+FEATURE_NAMES = (
+    'mean',
+    'std',
+    'min',
+    'max',
+    'slope',
+    'autocorr_lag1',
+    'spectral_low',
+    'spectral_mid',
+    'spectral_high',
+)
+
+
+def feature_column_names(dimension_names: List[str]) -> List[str]:
+    """Column names of the feature matrix: '<dimension>_<feature>', dimension-major."""
+    return [f"{dim}_{feature}" for dim in dimension_names for feature in FEATURE_NAMES]
+
+
+def compute_feature_block(block: np.ndarray) -> np.ndarray:
+    """
+    Computes all features for a (B, T, D) block of series.
+
+    Args:
+        block: Series of shape (B, T, D)
+
+    Returns:
+        Array of shape (B, D * len(FEATURE_NAMES)) in `feature_column_names` order.
+        Spectral features are the fractions of non-DC power in the low, middle
+        and high thirds of the spectrum; constant series get 0 for the
+        autocorrelation and spectral features.
+    """
+    block = np.asarray(block, dtype=np.float64)
+    n_batch, n_timesteps, n_dims = block.shape
+    features = np.zeros((n_batch, n_dims, len(FEATURE_NAMES)))
+
+    mean = block.mean(axis=1)
+    centered = block - mean[:, None, :]
+    variance = (centered ** 2).sum(axis=1)
+    features[..., 0] = mean
+    features[..., 1] = np.sqrt(variance / n_timesteps)
+    features[..., 2] = block.min(axis=1)
+    features[..., 3] = block.max(axis=1)
+
+    # Least-squares slope against the timestep index
+    t = np.arange(n_timesteps) - (n_timesteps - 1) / 2
+    denominator = (t ** 2).sum()
+    if denominator > 0:
+        features[..., 4] = np.einsum('btd,t->bd', centered, t) / denominator
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lag_product = (centered[:, 1:] * centered[:, :-1]).sum(axis=1)
+        features[..., 5] = np.where(variance > 0, lag_product / variance, 0.0)
+
+        power = np.abs(np.fft.rfft(centered, axis=1)[:, 1:]) ** 2
+        total_power = power.sum(axis=1)
+        if power.shape[1] > 0:
+            bands = np.array_split(np.arange(power.shape[1]), 3)
+            for i, band in enumerate(bands):
+                band_power = power[:, band].sum(axis=1) if band.size else np.zeros_like(total_power)
+                features[..., 6 + i] = np.where(total_power > 0, band_power / total_power, 0.0)
+
+    return features.reshape(n_batch, -1)
+
+
+def _memmap_feature_block(spec: Tuple[str, int, str, Tuple[int, ...]], start: int, stop: int) -> np.ndarray:
+    # Runs in a worker process: reopen the memory-mapped data and read only these rows
+    filename, offset, dtype, shape = spec
+    data = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape)
+    return compute_feature_block(data[start:stop])
+
+
+def extract_features(data: np.ndarray,
+                     n_jobs: Optional[int] = None,
+                     max_chunk_bytes: int = 64 * 1024 ** 2) -> np.ndarray:
+    """
+    Extracts the feature matrix of (N, T, D) series in chunks of rows.
+
+    Memory-mapped data is processed by a process pool whose workers map the
+    file themselves, so no series are pickled between processes. In-memory
+    arrays use a thread pool instead (NumPy releases the GIL in the heavy
+    reductions and FFTs), avoiding a copy of the data per worker.
+
+    Args:
+        data: Series of shape (N, T, D), in memory or memory-mapped
+        n_jobs: Number of workers (default: CPU count); 1 runs in-process
+        max_chunk_bytes: Approximate float64 working memory per chunk
+
+    Returns:
+        Feature matrix of shape (N, D * len(FEATURE_NAMES))
+    """
+    n_series, n_timesteps, n_dims = data.shape
+    n_jobs = n_jobs or os.cpu_count() or 1
+    rows = int(max(1, max_chunk_bytes // max(1, n_timesteps * n_dims * 8 * 4)))
+    chunks = [(start, min(start + rows, n_series)) for start in range(0, n_series, rows)]
+
+    if n_jobs == 1 or len(chunks) <= 1:
+        blocks = [compute_feature_block(data[start:stop]) for start, stop in chunks]
+    elif isinstance(data, np.memmap) and data.filename is not None and data.flags['C_CONTIGUOUS']:
+        spec = (data.filename, data.offset, data.dtype.str, data.shape)
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(_memmap_feature_block, spec, start, stop) for start, stop in chunks]
+            blocks = [future.result() for future in futures]
+    else:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            blocks = list(executor.map(lambda chunk: compute_feature_block(data[chunk[0]:chunk[1]]), chunks))
+
+    if not blocks:
+        return np.empty((0, n_dims * len(FEATURE_NAMES)))
+    return np.concatenate(blocks)
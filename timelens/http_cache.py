@@ -0,0 +1,162 @@
+# timelens/http_cache.py
+"""
+HTTP caching helpers for the server's read endpoints: ETags derived from the
+pod version and request parameters, content-encoding negotiation (gzip, and
+zstd when the `zstandard` package is installed) and an LRU cache of
+precompressed response bodies.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_zstd_compressor = None
+
+
+def _zstd():
+    """The zstd compressor, or None if `zstandard` is not installed."""
+    global _zstd_compressor
+    if _zstd_compressor is None:
+        try:
+            import zstandard
+        except ImportError:
+            _zstd_compressor = False
+        else:
+            _zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _zstd_compressor or None
+
+
+def supported_encodings() -> List[str]:
+    """Content codings the server can produce, in order of preference."""
+    return (['zstd'] if _zstd() is not None else []) + ['gzip']
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Picks the preferred supported content coding allowed by an Accept-Encoding
+    header, or None for an uncompressed (identity) response.
+    """
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for coding in supported_encodings():
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    """Encodes `body` with the given content coding (None for identity)."""
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == 'zstd':
+        return _zstd().compress(body)
+    return body
+
+
+def make_etag(pod_name: str, pod_version: int, shape: Tuple[int, ...],
+              source: Optional[Tuple[int, ...]], endpoint: str, params: Dict[str, Any]) -> str:
+    """
+    Weak ETag of a read response. It depends only on the pod identity and
+    version, the identity of the file it was loaded from (`source`, e.g.
+    inode, size and mtime, which change whenever the pod is re-saved) and the
+    normalized request parameters, so it is known (and a 304 can be answered)
+    without building the payload. It is weak because the same representation
+    is served under several content codings.
+    """
+    key = json.dumps([pod_name, pod_version, list(shape), source, endpoint, params],
+                     sort_keys=True, default=str)
+    return 'W/"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of encoded response bodies keyed on (ETag, requested
+    coding), bounded by the total size of the stored bodies. Each entry keeps
+    the coding actually applied, since small bodies are stored uncompressed.
+    """
+    def __init__(self, max_bytes: int = 256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[bytes, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str, encoding: Optional[str]) -> Optional[Tuple[bytes, Optional[str]]]:
+        with self._lock:
+            entry = self._entries.get((etag, encoding))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((etag, encoding))
+            self.hits += 1
+            return entry
+
+    def put(self, etag: str, encoding: Optional[str], body: bytes, applied_encoding: Optional[str]):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop((etag, encoding), None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self._entries[(etag, encoding)] = (body, applied_encoding)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def render_prometheus(self) -> str:
+        """Cache counters in the Prometheus text exposition format."""
+        with self._lock:
+            lines = ["# HELP timelens_response_cache_hits_total Read responses served from the body cache.",
+                     "# TYPE timelens_response_cache_hits_total counter",
+                     f"timelens_response_cache_hits_total {self.hits}",
+                     "# HELP timelens_response_cache_misses_total Read responses built because they were not cached.",
+                     "# TYPE timelens_response_cache_misses_total counter",
+                     f"timelens_response_cache_misses_total {self.misses}",
+                     "# HELP timelens_response_cache_bytes Size of the cached response bodies.",
+                     "# TYPE timelens_response_cache_bytes gauge",
+                     f"timelens_response_cache_bytes {self.size}"]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,161 @@
+# timelens/instrumentation.py
+"""
+Request-level performance instrumentation for the server: per-phase timings,
+per-endpoint counters and latency histograms, memory samples, Prometheus text
+export and optional cProfile capture of slow requests.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Phases timed inside a request; 'validation' is the request time not spent in
+# the other phases (argument checks, index parsing and framework overhead)
+PHASES = ('parse', 'validation', 'compute', 'serialization')
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Current resident set size of this process (Linux only), or None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class RequestTimer:
+    """
+    Wall-clock timings of one request, split into phases.
+
+    Phases are timed with `phase(name)`; repeated phases accumulate.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def finish(self) -> Tuple[float, Dict[str, float]]:
+        """Total duration and per-phase durations, including the derived 'validation' phase."""
+        total = time.perf_counter() - self.start
+        phases = {name: self.phases.get(name, 0.0) for name in PHASES if name != 'validation'}
+        phases['validation'] = max(0.0, total - sum(phases.values()))
+        return total, phases
+
+
+class RequestMetrics:
+    """
+    Thread-safe per-endpoint request counters, latency histograms, phase
+    totals, response sizes and memory samples.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self._latency_buckets: Dict[str, List[int]] = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self._latency_sum: Dict[str, float] = defaultdict(float)
+        self._latency_count: Dict[str, int] = defaultdict(int)
+        self._phase_sum: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._response_bytes: Dict[str, int] = defaultdict(int)
+        self._peak_rss: Optional[int] = None
+        self._slow_profiles = 0
+
+    def observe(self, endpoint: str, method: str, status: int, duration: float,
+                phases: Dict[str, float], response_bytes: int):
+        """Records one finished request."""
+        peak = peak_rss_bytes()
+        with self._lock:
+            self._requests[(endpoint, method, status)] += 1
+            histogram = self._latency_buckets[endpoint]
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    histogram[i] += 1
+            histogram[-1] += 1  # +Inf
+            self._latency_sum[endpoint] += duration
+            self._latency_count[endpoint] += 1
+            for phase_name, seconds in phases.items():
+                self._phase_sum[(endpoint, phase_name)] += seconds
+            self._response_bytes[endpoint] += response_bytes
+            if peak is not None:
+                self._peak_rss = max(self._peak_rss or 0, peak)
+
+    def record_profile(self):
+        with self._lock:
+            self._slow_profiles += 1
+
+    def render_prometheus(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            lines += ["# HELP timelens_requests_total Requests handled, by endpoint, method and status.",
+                      "# TYPE timelens_requests_total counter"]
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'timelens_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            lines += ["# HELP timelens_request_duration_seconds Request latency, by endpoint.",
+                      "# TYPE timelens_request_duration_seconds histogram"]
+            for endpoint in sorted(self._latency_buckets):
+                histogram = self._latency_buckets[endpoint]
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append(f'timelens_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+                lines.append(f'timelens_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram[-1]}')
+                lines.append(f'timelens_request_duration_seconds_sum{{endpoint="{endpoint}"}} {self._latency_sum[endpoint]}')
+                lines.append(f'timelens_request_duration_seconds_count{{endpoint="{endpoint}"}} {self._latency_count[endpoint]}')
+
+            lines += ["# HELP timelens_request_phase_seconds_total Time spent in each request phase, by endpoint.",
+                      "# TYPE timelens_request_phase_seconds_total counter"]
+            for (endpoint, phase_name), seconds in sorted(self._phase_sum.items()):
+                lines.append(f'timelens_request_phase_seconds_total{{endpoint="{endpoint}",phase="{phase_name}"}} {seconds}')
+
+            lines += ["# HELP timelens_response_bytes_total Response body bytes sent, by endpoint.",
+                      "# TYPE timelens_response_bytes_total counter"]
+            for endpoint, total in sorted(self._response_bytes.items()):
+                lines.append(f'timelens_response_bytes_total{{endpoint="{endpoint}"}} {total}')
+
+            lines += ["# HELP timelens_slow_request_profiles_total Slow requests captured with cProfile.",
+                      "# TYPE timelens_slow_request_profiles_total counter",
+                      f"timelens_slow_request_profiles_total {self._slow_profiles}"]
+            peak = self._peak_rss
+
+        current = current_rss_bytes()
+        if peak is not None:
+            lines += ["# HELP timelens_peak_rss_bytes Peak resident memory of the server process.",
+                      "# TYPE timelens_peak_rss_bytes gauge",
+                      f"timelens_peak_rss_bytes {peak}"]
+        if current is not None:
+            lines += ["# HELP timelens_rss_bytes Current resident memory of the server process.",
+                      "# TYPE timelens_rss_bytes gauge",
+                      f"timelens_rss_bytes {current}"]
+        return "\n".join(lines) + "\n"
+
+
+def server_timing_header(duration: float, phases: Dict[str, float]) -> str:
+    """Formats request timings as a `Server-Timing` header (milliseconds)."""
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()]
+    entries.append(f"total;dur={duration * 1000:.2f}")
+    return ", ".join(entries)
@@ -2,8 +2,8 @@
 Statistical testing utilities for comparing selected vs non-selected groups.
 """
 import numpy as np
-from scipy import stats
-from typing import Dict, List, Union, Tuple, Any
+from typing import Dict, List, Union, Tuple, Any, Sequence
+from timelens.utils import time_chunks
 
 
 def t_test_two_groups(values: List[float], group_labels: List[int]) -> Dict[str, Any]:
@@ -17,6 +17,8 @@ def t_test_two_groups(values: List[float], group_labels: List[int]) -> Dict[str,
     Returns:
         Dictionary with test results including statistic, p-value, and interpretation
     """
+    from scipy import stats
+
     try:
         values_array = np.array(values)
         labels_array = np.array(group_labels)
@@ -90,6 +92,8 @@ def mann_whitney_test(values: List[float], group_labels: List[int]) -> Dict[str,
     Returns:
         Dictionary with test results
     """
+    from scipy import stats
+
     try:
         values_array = np.array(values)
         labels_array = np.array(group_labels)
@@ -153,6 +157,8 @@ def chi_square_test(categories: List[Union[str, int]], group_labels: List[int])
     Returns:
         Dictionary with test results
     """
+    from scipy import stats
+
     try:
         categories_array = np.array(categories)
         labels_array = np.array(group_labels)
@@ -290,3 +296,483 @@ def run_categorical_tests(categories: List[Union[str, int]], group_labels: List[
     return {
         "chi_square": chi_square_test(categories, group_labels)
     }
+
+
+# --- Multiple-testing correction and variable ranking ---
+
+SUPPORTED_CORRECTIONS = ('fdr_bh', 'bonferroni')
+
+
+def adjust_p_values(p_values: Union[List[float], np.ndarray], method: str = 'fdr_bh') -> np.ndarray:
+    """
+    Adjust a family of p-values for multiple testing.
+    
+    Args:
+        p_values: Raw p-values, one per test. NaNs (invalid tests) are ignored and
+                  do not count towards the number of tests.
+        method: 'fdr_bh' (Benjamini-Hochberg false discovery rate) or 'bonferroni'
+    
+    Returns:
+        Array of adjusted p-values with the same shape as the input
+    """
+    p = np.asarray(p_values, dtype=float)
+    adjusted = np.full(p.shape, np.nan)
+    flat_p = p.ravel()
+    flat_adjusted = adjusted.ravel()
+
+    valid = np.flatnonzero(~np.isnan(flat_p))
+    m = len(valid)
+    if m == 0:
+        return adjusted
+
+    if method == 'bonferroni':
+        flat_adjusted[valid] = np.minimum(flat_p[valid] * m, 1.0)
+    elif method == 'fdr_bh':
+        order = valid[np.argsort(flat_p[valid], kind='mergesort')]
+        ranked = flat_p[order] * m / np.arange(1, m + 1)
+        # Enforce monotonicity from the largest p-value downwards
+        ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+        flat_adjusted[order] = np.minimum(ranked, 1.0)
+    else:
+        raise ValueError(f"Unsupported correction: {method}. Use one of {SUPPORTED_CORRECTIONS}")
+
+    return flat_adjusted.reshape(p.shape)
+
+
+def screen_numerical_variables(values: Union[np.ndarray, Sequence[np.ndarray]],
+                               group_labels: np.ndarray,
+                               max_chunk_bytes: int = 64 * 1024 ** 2) -> Dict[str, np.ndarray]:
+    """
+    Cheap, vectorized Student's t screening of many numerical variables at once.
+    
+    Mirrors `t_test_two_groups` (pooled variance, Cohen's d) but works on a
+    (V, N) matrix so hundreds of variables cost a handful of NumPy reductions.
+    Variables are processed a block of rows at a time, so the temporaries stay
+    within `max_chunk_bytes` however many variables there are.
+    Non-finite values are excluded per variable.
+    
+    Args:
+        values: Array of shape (V, N), or a sequence of V (N,) arrays, with one
+                row per variable
+        group_labels: Array of N 0s and 1s indicating group membership
+        max_chunk_bytes: Working memory budget per block of variables
+    
+    Returns:
+        Dictionary of (V,) arrays: 'statistic', 'p_value', 'cohens_d',
+        'effect_size' (point-biserial |r|, comparable to Cramér's V), 'n_a', 'n_b'.
+        Variables with fewer than 2 observations per group get NaN statistics.
+    """
+    from scipy import stats
+
+    labels = np.asarray(group_labels).astype(bool)
+    n_vars = len(values)
+    n_a = np.zeros(n_vars, dtype=np.intp)
+    n_b = np.zeros(n_vars, dtype=np.intp)
+    mean_a = np.empty(n_vars)
+    mean_b = np.empty(n_vars)
+    ss_a = np.empty(n_vars)
+    ss_b = np.empty(n_vars)
+
+    # About six (rows, N) temporaries are alive at once
+    rows_per_chunk = int(max(1, max_chunk_bytes // max(1, 6 * 8 * labels.size)))
+    for start in range(0, n_vars, rows_per_chunk):
+        rows = slice(start, min(start + rows_per_chunk, n_vars))
+        block = np.asarray(values[rows], dtype=float)
+        finite = np.isfinite(block)
+        clean = np.where(finite, block, 0.0)
+        in_a = finite & labels
+        in_b = finite & ~labels
+        n_a[rows] = in_a.sum(axis=1)
+        n_b[rows] = in_b.sum(axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_a[rows] = (clean * in_a).sum(axis=1) / n_a[rows]
+            mean_b[rows] = (clean * in_b).sum(axis=1) / n_b[rows]
+            ss_a[rows] = (((clean - mean_a[rows, None]) ** 2) * in_a).sum(axis=1)
+            ss_b[rows] = (((clean - mean_b[rows, None]) ** 2) * in_b).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dof = n_a + n_b - 2
+        pooled_var = (ss_a + ss_b) / dof
+        pooled_std = np.sqrt(pooled_var)
+        statistic = (mean_a - mean_b) / np.sqrt(pooled_var * (1.0 / n_a + 1.0 / n_b))
+        cohens_d = np.where(pooled_std > 0, (mean_a - mean_b) / pooled_std, 0.0)
+        effect_size = np.abs(statistic) / np.sqrt(statistic ** 2 + dof)
+
+    p_value = 2 * stats.t.sf(np.abs(statistic), dof)
+
+    invalid = (n_a < 2) | (n_b < 2)
+    for arr in (statistic, p_value, cohens_d, effect_size):
+        arr[invalid] = np.nan
+
+    return {
+        "statistic": statistic,
+        "p_value": p_value,
+        "cohens_d": cohens_d,
+        "effect_size": effect_size,
+        "n_a": n_a,
+        "n_b": n_b
+    }
+
+
+def screen_categorical_variable(categories: np.ndarray, group_labels: np.ndarray) -> Dict[str, float]:
+    """
+    Cheap chi-squared screening of one categorical variable.
+    
+    Builds the contingency table with a single `bincount` instead of one mask
+    per category and applies the same Yates correction as `chi_square_test`.
+    
+    Args:
+        categories: Array of N categorical values
+        group_labels: Array of N 0s and 1s indicating group membership
+    
+    Returns:
+        Dictionary with 'statistic', 'p_value' and 'effect_size' (Cramér's V),
+        all NaN if the test is not valid for this selection
+    """
+    from scipy import stats
+
+    invalid = {"statistic": np.nan, "p_value": np.nan, "effect_size": np.nan}
+
+    _, codes = np.unique(np.asarray(categories), return_inverse=True)
+    labels = np.asarray(group_labels).astype(np.intp)
+    n_categories = int(codes.max()) + 1 if len(codes) else 0
+
+    # Column 0 = selected, column 1 = non-selected (same layout as chi_square_test)
+    table = np.bincount(codes * 2 + (1 - labels), minlength=n_categories * 2).reshape(-1, 2)
+    n = table.sum()
+    if n < 5 or n_categories < 2 or np.any(table.sum(axis=0) == 0):
+        return invalid
+
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0, keepdims=True) / n
+    diff = np.abs(table - expected)
+    dof = n_categories - 1
+    if dof == 1:
+        diff = np.maximum(diff - 0.5, 0.0)
+    chi2_stat = float((diff ** 2 / expected).sum())
+
+    return {
+        "statistic": chi2_stat,
+        "p_value": float(stats.chi2.sf(chi2_stat, dof)),
+        "effect_size": float(np.sqrt(chi2_stat / n))
+    }
+
+
+def rank_variables(
+    series_variables: Dict[str, Dict[str, Any]],
+    group_labels: Union[List[int], np.ndarray],
+    k: int = 10,
+    variable_names: Union[List[str], None] = None,
+    alpha: float = 0.05
+) -> Dict[str, Any]:
+    """
+    Rank series variables by how strongly they separate the selected group.
+    
+    The ranking runs in two stages so the cost stays bounded as the number of
+    variables grows:
+    1. Every variable is screened with cheap vectorized statistics (t-test for
+       numerical, chi-squared for categorical), and the resulting p-values are
+       adjusted with both Benjamini-Hochberg and Bonferroni corrections.
+    2. Variables are ordered by effect size (point-biserial |r| for numerical,
+       Cramér's V for categorical, both on a 0-1 scale) and the full
+       `run_numerical_tests`/`run_categorical_tests` are run only for the top k.
+    
+    Args:
+        series_variables: The `TSPod.series_variables` dictionary
+        group_labels: List of N 0s and 1s indicating group membership
+        k: Number of top-ranked variables to run the full tests on
+        variable_names: Optional subset of variables to rank (default: all)
+        alpha: Significance level applied to the adjusted p-values
+    
+    Returns:
+        Dictionary with the screened statistics of every variable and the
+        detailed test results for the top k
+    """
+    labels = np.asarray(group_labels).astype(np.intp)
+    if variable_names is None:
+        variable_names = list(series_variables.keys())
+
+    unknown = [name for name in variable_names if name not in series_variables]
+    if unknown:
+        raise ValueError(f"Unknown variables: {unknown}")
+    if k < 1:
+        raise ValueError("k must be >= 1")
+
+    numerical_names = [n for n in variable_names if series_variables[n]['type'] == 'numerical']
+    categorical_names = [n for n in variable_names if series_variables[n]['type'] == 'categorical']
+
+    # --- Stage 1: cheap screening of every variable ---
+    screened = []
+    if numerical_names:
+        # Rows are stacked a block at a time inside the screening, never all at once
+        numerical_stats = screen_numerical_variables([series_variables[n]['values'] for n in numerical_names], labels)
+        for i, name in enumerate(numerical_names):
+            screened.append({
+                "variable_name": name,
+                "type": "numerical",
+                "statistic": numerical_stats['statistic'][i],
+                "p_value": numerical_stats['p_value'][i],
+                "effect_size": numerical_stats['effect_size'][i]
+            })
+    for name in categorical_names:
+        categorical_stats = screen_categorical_variable(series_variables[name]['values'], labels)
+        screened.append({"variable_name": name, "type": "categorical", **categorical_stats})
+
+    p_values = np.array([entry['p_value'] for entry in screened], dtype=float)
+    p_fdr = adjust_p_values(p_values, 'fdr_bh')
+    p_bonferroni = adjust_p_values(p_values, 'bonferroni')
+
+    for i, entry in enumerate(screened):
+        entry['p_value_fdr_bh'] = p_fdr[i]
+        entry['p_value_bonferroni'] = p_bonferroni[i]
+        entry['significant'] = bool(p_fdr[i] < alpha)
+        # Replace NaN with None so the result is JSON-serializable
+        for key in ('statistic', 'p_value', 'effect_size', 'p_value_fdr_bh', 'p_value_bonferroni'):
+            entry[key] = None if np.isnan(entry[key]) else float(entry[key])
+
+    # Larger effect first, smaller p-value breaks ties, invalid tests last
+    screened.sort(key=lambda e: (
+        e['effect_size'] is None,
+        -(e['effect_size'] or 0.0),
+        e['p_value'] if e['p_value'] is not None else 1.0
+    ))
+    for rank, entry in enumerate(screened, start=1):
+        entry['rank'] = rank
+
+    # --- Stage 2: full tests for the top k only ---
+    top_k = []
+    for entry in screened[:k]:
+        if entry['effect_size'] is None:
+            break
+        values = series_variables[entry['variable_name']]['values']
+        if entry['type'] == 'numerical':
+            tests = run_numerical_tests(values, labels)
+        else:
+            tests = run_categorical_tests(values, labels)
+        top_k.append({**entry, "tests": tests})
+
+    return {
+        "n_variables": len(screened),
+        "k": k,
+        "alpha": alpha,
+        "n_significant_fdr_bh": int(np.sum(p_fdr < alpha)),
+        "n_significant_bonferroni": int(np.sum(p_bonferroni < alpha)),
+        "top_k": top_k,
+        "screened": screened
+    }
+
+
+
+# --- Temporal difference testing over (N, T, D) series ---
+
+SUPPORTED_TEMPORAL_CORRECTIONS = SUPPORTED_CORRECTIONS + ('cluster',)
+
+
+def _welch_t_from_sums(sum_a, sumsq_a, n_a, sum_total, sumsq_total, n_total):
+    """Welch's t statistic, dof and group moments from running sums."""
+    n_b = n_total - n_a
+    mean_a = sum_a / n_a
+    mean_b = (sum_total - sum_a) / n_b
+    var_a = np.maximum(sumsq_a - n_a * mean_a ** 2, 0.0) / (n_a - 1)
+    var_b = np.maximum((sumsq_total - sumsq_a) - n_b * mean_b ** 2, 0.0) / (n_b - 1)
+    se_a = var_a / n_a
+    se_b = var_b / n_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        statistic = (mean_a - mean_b) / np.sqrt(se_a + se_b)
+        dof = (se_a + se_b) ** 2 / (se_a ** 2 / (n_a - 1) + se_b ** 2 / (n_b - 1))
+    return statistic, dof, mean_a, mean_b
+
+
+def _update_cluster_runs(t_step, threshold, run_sign, run_mass, max_mass):
+    """Advances supra-threshold run tracking by one timestep (vectorized over runs)."""
+    step_sign = np.where(np.abs(t_step) > threshold, np.sign(t_step), 0.0)
+    continues = (step_sign == run_sign) & (step_sign != 0)
+    np.maximum(max_mass, np.where(continues, 0.0, run_mass), out=max_mass)
+    run_mass[:] = np.where(continues, run_mass, 0.0) + np.where(step_sign != 0, np.abs(t_step), 0.0)
+    run_sign[:] = step_sign
+
+
+def _find_clusters(statistic: np.ndarray, threshold: float) -> List[Dict[str, Any]]:
+    """Contiguous supra-threshold runs of same-signed t values along T, per dimension."""
+    clusters = []
+    n_timesteps, n_dims = statistic.shape
+    for dim in range(n_dims):
+        start = None
+        for t in range(n_timesteps + 1):
+            value = statistic[t, dim] if t < n_timesteps else 0.0
+            sign = np.sign(value) if abs(value) > threshold else 0.0
+            if start is not None and sign != run_sign:
+                clusters.append({
+                    "dimension": dim,
+                    "start": start,
+                    "end": t - 1,
+                    "mass": float(np.abs(statistic[start:t, dim]).sum()),
+                    "sign": int(run_sign)
+                })
+                start = None
+            if start is None and sign != 0:
+                start, run_sign = t, sign
+    return clusters
+
+
+def _json_floats(values: np.ndarray) -> List[Union[float, None]]:
+    """Flattens an array to a list, replacing NaN with None for JSON."""
+    return [None if np.isnan(v) else v for v in np.asarray(values, dtype=float).ravel().tolist()]
+
+
+def temporal_difference_test(
+    data: np.ndarray,
+    group_labels: Union[List[int], np.ndarray],
+    correction: str = 'fdr_bh',
+    alpha: float = 0.05,
+    n_permutations: int = 500,
+    cluster_threshold: Union[float, None] = None,
+    random_state: int = 42,
+    max_chunk_bytes: int = 64 * 1024 ** 2
+) -> Dict[str, Any]:
+    """
+    Per-timestep, per-dimension Welch's t-test between selected and non-selected series.
+    
+    The (N, T, D) array is read once, one block of timesteps at a time, so it
+    works on memory-mapped pods larger than RAM. With correction='cluster', a
+    cluster-based permutation test is run in the same pass: the permuted group
+    sums are computed with matrix products per block, a few permutations at a
+    time, and supra-threshold runs along T are tracked across blocks. The
+    permutations are kept bit-packed (n_permutations x N / 8 bytes) and the
+    float64 products stay within `max_chunk_bytes`. Its cost grows with
+    n_permutations x N, so prefer 'fdr_bh' for very large pods.
+    
+    Args:
+        data: Array of shape (N, T, D), e.g. `TSPod.data`
+        group_labels: List of N 0s and 1s indicating group membership
+        correction: 'fdr_bh', 'bonferroni' or 'cluster'
+        alpha: Significance level
+        n_permutations: Number of label permutations for correction='cluster'
+        cluster_threshold: |t| forming clusters (default: two-sided critical t at alpha)
+        random_state: Random seed for the permutations
+        max_chunk_bytes: Working memory budget per block of timesteps
+    
+    Returns:
+        Dictionary with flattened (T, D) arrays of statistics, raw and adjusted
+        p-values and significance, plus the clusters for correction='cluster'
+    """
+    from scipy import stats
+
+    test_name = "Welch's t-test (per timestep)"
+    try:
+        if correction not in SUPPORTED_TEMPORAL_CORRECTIONS:
+            raise ValueError(f"Unsupported correction: {correction}. Use one of {SUPPORTED_TEMPORAL_CORRECTIONS}")
+
+        n_series, n_timesteps, n_dims = data.shape
+        labels = np.asarray(group_labels).astype(bool)
+        if labels.shape != (n_series,):
+            raise ValueError(f"group_labels length ({labels.size}) does not match number of series ({n_series})")
+
+        n_a = int(labels.sum())
+        n_b = n_series - n_a
+        if n_a < 2 or n_b < 2:
+            return {
+                "test_name": test_name,
+                "error": "Insufficient data: Each group needs at least 2 observations",
+                "valid": False
+            }
+
+        use_clusters = correction == 'cluster'
+        if use_clusters:
+            if cluster_threshold is None:
+                cluster_threshold = float(stats.t.ppf(1 - alpha / 2, n_a + n_b - 2))
+            rng = np.random.default_rng(random_state)
+            permuted = np.zeros((n_permutations, (n_series + 7) // 8), dtype=np.uint8)
+            membership = np.zeros(n_series, dtype=np.uint8)
+            for row in permuted:
+                membership[:] = 0
+                membership[rng.choice(n_series, n_a, replace=False)] = 1
+                row[:] = np.packbits(membership)
+            # Half the budget holds one chunk of unpacked permutation rows (uint8 + float64)
+            perm_rows = int(max(1, (max_chunk_bytes // 2) // (n_series * 9)))
+            # Run state per (permutation, dimension), carried across blocks
+            run_sign = np.zeros((n_permutations, n_dims))
+            run_mass = np.zeros((n_permutations, n_dims))
+            max_mass = np.zeros((n_permutations, n_dims))
+
+        statistic = np.empty((n_timesteps, n_dims))
+        dof = np.empty((n_timesteps, n_dims))
+        mean_a = np.empty((n_timesteps, n_dims))
+        mean_b = np.empty((n_timesteps, n_dims))
+
+        # Block budget accounts for the data copy, its centered copy, its square,
+        # the group subsets and the permuted sums, sums of squares and t
+        # statistics of every permutation
+        budget_rows = 4 * n_series + (6 * n_permutations if use_clusters else 0)
+        block_bytes = max_chunk_bytes // 2 if use_clusters else max_chunk_bytes
+        for chunk in time_chunks(budget_rows, n_timesteps, n_dims, block_bytes):
+            block = np.asarray(data[:, chunk], dtype=np.float64).reshape(n_series, -1)
+            # Centering keeps the sum-of-squares formulation numerically stable
+            center = block.mean(axis=0)
+            block = block - center
+            squared = block ** 2
+            sum_total = block.sum(axis=0)
+            sumsq_total = squared.sum(axis=0)
+
+            t_obs, dof_obs, m_a, m_b = _welch_t_from_sums(
+                block[labels].sum(axis=0), squared[labels].sum(axis=0), n_a, sum_total, sumsq_total, n_series)
+            shape = (-1, n_dims)
+            statistic[chunk] = t_obs.reshape(shape)
+            dof[chunk] = dof_obs.reshape(shape)
+            mean_a[chunk] = (m_a + center).reshape(shape)
+            mean_b[chunk] = (m_b + center).reshape(shape)
+
+            if use_clusters:
+                perm_sum = np.empty((n_permutations, block.shape[1]))
+                perm_sumsq = np.empty((n_permutations, block.shape[1]))
+                for start in range(0, n_permutations, perm_rows):
+                    rows = slice(start, start + perm_rows)
+                    mask = np.unpackbits(permuted[rows], axis=1, count=n_series).astype(np.float64)
+                    perm_sum[rows] = mask @ block
+                    perm_sumsq[rows] = mask @ squared
+                t_perm, _, _, _ = _welch_t_from_sums(
+                    perm_sum, perm_sumsq, n_a, sum_total, sumsq_total, n_series)
+                t_perm = np.nan_to_num(t_perm.reshape(n_permutations, -1, n_dims))
+                for step in range(t_perm.shape[1]):
+                    _update_cluster_runs(t_perm[:, step], cluster_threshold, run_sign, run_mass, max_mass)
+
+        p_value = 2 * stats.t.sf(np.abs(statistic), dof)
+
+        result = {
+            "test_name": test_name,
+            "shape": (n_timesteps, n_dims),
+            "statistic": _json_floats(statistic),
+            "p_value": _json_floats(p_value),
+            "correction": correction,
+            "alpha": alpha,
+            "group_a_stats": {"name": "Selected", "n": n_a, "mean": _json_floats(mean_a)},
+            "group_b_stats": {"name": "Non-selected", "n": n_b, "mean": _json_floats(mean_b)},
+            "valid": True
+        }
+
+        if use_clusters:
+            np.maximum(max_mass, run_mass, out=max_mass)
+            null_distribution = max_mass.max(axis=1)
+            clusters = _find_clusters(np.nan_to_num(statistic), cluster_threshold)
+            p_adjusted = np.ones((n_timesteps, n_dims))
+            for cluster in clusters:
+                cluster_p = (1 + np.sum(null_distribution >= cluster['mass'])) / (n_permutations + 1)
+                cluster['p_value'] = float(cluster_p)
+                cluster['significant'] = bool(cluster_p < alpha)
+                p_adjusted[cluster['start']:cluster['end'] + 1, cluster['dimension']] = cluster_p
+            result['cluster_threshold'] = cluster_threshold
+            result['n_permutations'] = n_permutations
+            result['clusters'] = clusters
+        else:
+            p_adjusted = adjust_p_values(p_value, correction)
+
+        result['p_value_adjusted'] = _json_floats(p_adjusted)
+        result['significant'] = (np.nan_to_num(p_adjusted, nan=1.0).ravel() < alpha).tolist()
+        return result
+
+    except Exception as e:
+        return {
+            "test_name": test_name,
+            "error": f"Error performing temporal difference test: {str(e)}",
+            "valid": False
+        }
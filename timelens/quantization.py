@@ -0,0 +1,202 @@
+# timelens/quantization.py
+"""
+Reduced-precision storage of pod series: float32/float16, or scaled unsigned
+integers with a per-dimension scale and offset (x ≈ q * scale + offset).
+
+The error bound of every dimension is determined when the data is quantized
+and stored with the pod. Integer-quantized data is wrapped in a
+`QuantizedArray`, which dequantizes to float64 only the rows that are read.
+"""
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+PRECISIONS = {
+    'float64': np.float64,
+    'float32': np.float32,
+    'float16': np.float16,
+    'uint16': np.uint16,
+    'uint8': np.uint8,
+}
+
+
+class QuantizedArray:
+    """
+    Read-only (N, T, D) view of scaled-integer series.
+
+    Indexing returns dequantized float64 values for the selected elements only,
+    so memory-mapped integer data is never upcast as a whole. The stored
+    integers are available as `raw`, e.g. to serve them without decoding.
+    """
+    def __init__(self,
+                 raw: np.ndarray,
+                 scale: np.ndarray,
+                 offset: np.ndarray,
+                 error_bound: Optional[np.ndarray] = None):
+        self.raw = raw
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.error_bound = error_bound if error_bound is not None else self.scale / 2
+        self.shape = raw.shape
+        self.ndim = raw.ndim
+        self.dtype = np.dtype(np.float64)
+
+    @property
+    def precision(self) -> str:
+        return self.raw.dtype.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.raw.nbytes
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key) -> np.ndarray:
+        values = np.asarray(self.raw[key], dtype=np.float64)
+        keys = key if isinstance(key, tuple) else (key,)
+        if len(keys) < self.ndim and not any(k is Ellipsis for k in keys):
+            # The dimension axis is untouched and last, so scale/offset broadcast directly
+            return values * self.scale + self.offset
+        scale = np.broadcast_to(self.scale, self.shape)[key]
+        offset = np.broadcast_to(self.offset, self.shape)[key]
+        return values * scale + offset
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"<QuantizedArray shape={self.shape} precision='{self.precision}'>"
+
+
+def _row_chunks(n_series: int, n_timesteps: int, n_dims: int, max_chunk_bytes: int) -> Iterator[slice]:
+    rows = int(max(1, max_chunk_bytes // max(1, n_timesteps * n_dims * 8 * 3)))
+    for start in range(0, n_series, rows):
+        yield slice(start, min(start + rows, n_series))
+
+
+def plan_quantization(data: Any, precision: str, max_chunk_bytes: int = 64 * 1024 ** 2) -> Dict[str, Any]:
+    """
+    Chooses how to store (N, T, D) series at `precision`, in one chunked pass.
+
+    For integer precisions the per-dimension offset is the minimum and the
+    scale spreads the range over all integer levels, so the error is at most
+    half a step. For float precisions the error is the largest rounding error
+    actually observed.
+
+    Returns:
+        Dictionary with 'precision', 'dtype', 'scale' and 'offset' (None for
+        float precisions) and the per-dimension 'error_bound'.
+
+    Raises:
+        ValueError: For unknown precisions, values that overflow float16, or
+                    non-finite values with an integer precision.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unsupported precision '{precision}'. Choose from {list(PRECISIONS)}.")
+    dtype = np.dtype(PRECISIONS[precision])
+    n_series, n_timesteps, n_dims = data.shape
+    integer = np.issubdtype(dtype, np.integer)
+
+    low = np.full(n_dims, np.inf)
+    high = np.full(n_dims, -np.inf)
+    error = np.zeros(n_dims)
+    for rows in _row_chunks(n_series, n_timesteps, n_dims, max_chunk_bytes):
+        block = np.asarray(data[rows], dtype=np.float64).reshape(-1, n_dims)
+        finite = np.isfinite(block)
+        if integer:
+            if not finite.all():
+                raise ValueError(f"Precision '{precision}' cannot store NaN or infinite values; use a float precision.")
+            if block.size:
+                low = np.minimum(low, block.min(axis=0))
+                high = np.maximum(high, block.max(axis=0))
+        else:
+            with np.errstate(over='ignore', invalid='ignore'):
+                cast = block.astype(dtype).astype(np.float64)
+            if (finite & ~np.isfinite(cast)).any():
+                raise ValueError(f"Values exceed the range of '{precision}'.")
+            deviation = np.where(finite, np.abs(cast - block), 0.0)
+            if deviation.size:
+                error = np.maximum(error, deviation.max(axis=0))
+
+    if not integer:
+        return {'precision': precision, 'dtype': dtype, 'scale': None, 'offset': None, 'error_bound': error}
+
+    low[~np.isfinite(low)] = 0.0
+    high[~np.isfinite(high)] = 0.0
+    scale = (high - low) / np.iinfo(dtype).max
+    scale[scale == 0] = 1.0
+    return {'precision': precision, 'dtype': dtype, 'scale': scale, 'offset': low, 'error_bound': scale / 2}
+
+
+def quantize_block(block: Any, plan: Dict[str, Any]) -> np.ndarray:
+    """
+    Converts a block of (..., D) series to the stored dtype of `plan`.
+
+    Raises:
+        ValueError: If integer-quantized values fall outside the planned range
+                    by more than the error bound (e.g. when appending series).
+    """
+    if plan['scale'] is None:
+        return np.asarray(block).astype(plan['dtype'])
+    levels = (np.asarray(block, dtype=np.float64) - plan['offset']) / plan['scale']
+    if levels.size and (levels.min() < -0.5 or levels.max() > np.iinfo(plan['dtype']).max + 0.5):
+        raise ValueError("Values fall outside the quantization range of the pod; re-save it with `precision`.")
+    return np.clip(np.rint(levels), 0, np.iinfo(plan['dtype']).max).astype(plan['dtype'])
+
+
+def quantize(data: Any,
+             precision: str,
+             max_chunk_bytes: int = 64 * 1024 ** 2) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Quantizes (N, T, D) series in memory.
+
+    Returns:
+        The stored array and its plan (see `plan_quantization`).
+    """
+    plan = plan_quantization(data, precision, max_chunk_bytes)
+    n_series, n_timesteps, n_dims = data.shape
+    stored = np.empty(data.shape, dtype=plan['dtype'])
+    for rows in _row_chunks(n_series, n_timesteps, n_dims, max_chunk_bytes):
+        stored[rows] = quantize_block(data[rows], plan)
+    return stored, plan
+
+
+def compact_values(values: np.ndarray,
+                   error_bound: Optional[np.ndarray],
+                   dtype: Any = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Makes (..., D) float values serialize to short JSON.
+
+    Dimensions with a positive error bound are rounded to the fewest decimals
+    that keep them within 1.1x that bound. Dimensions of float32/float16 data
+    without a known positive bound are converted through the shortest decimal
+    that round-trips at that precision (e.g. 0.7303005 rather than
+    0.7303004860877991), which decodes to the stored value exactly once cast
+    back to `dtype`. Float64 data without a bound is returned unchanged, so
+    compact payloads only shrink for reduced-precision or bounded pods.
+
+    Args:
+        values: Values of shape (..., D)
+        error_bound: Per-dimension error bound, or None if unknown
+        dtype: Stored precision of the values (default: their own dtype)
+
+    Returns:
+        The compacted values and the resulting per-dimension error bound
+        (None if unknown).
+    """
+    values = np.asarray(values)
+    dtype = np.dtype(dtype) if dtype is not None else values.dtype
+    compact = np.array(values, dtype=np.float64)
+    bound = np.asarray(error_bound, dtype=np.float64).copy() if error_bound is not None else None
+    short_repr = dtype in (np.dtype(np.float32), np.dtype(np.float16))
+    for dim in range(compact.shape[-1]):
+        dim_bound = bound[dim] if bound is not None else 0.0
+        if dim_bound > 0:
+            decimals = int(np.ceil(-np.log10(dim_bound / 5)))
+            compact[..., dim] = np.round(compact[..., dim], decimals)
+            bound[dim] = dim_bound + 0.5 * 10.0 ** -decimals
+        elif short_repr:
+            compact[..., dim] = values[..., dim].astype(dtype).astype(str).astype(np.float64)
+    return compact, bound
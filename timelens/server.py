@@ -1,96 +1,499 @@
 # timelens/server.py
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
+import numpy as np
+import cProfile
+import contextlib
+import importlib
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+from werkzeug.serving import make_server
 # We now import our new TSPod class
 from timelens.storage import TSPod 
-from timelens.metrics import run_numerical_tests, run_categorical_tests
+from timelens.metrics import run_numerical_tests, run_categorical_tests, rank_variables, temporal_difference_test
 from timelens.clustering import get_clustering_result, estimate_dbscan_eps 
+from timelens.instrumentation import RequestMetrics, RequestTimer, server_timing_header
+from timelens.http_cache import (MIN_COMPRESS_BYTES, ResponseCache, compress, etag_matches,
+                                 make_etag, negotiate_encoding)
 
-# Global variable to hold our single loaded TSPod instance
+# Global variable to hold our single loaded TSPod instance.
+# Handlers take one local reference to it at the start of each request, so a
+# hot reload (see PodWatcher) can swap in a new pod without affecting
+# requests that are already in flight.
 tspod = None
 
 app = Flask(__name__)
 # Enable Cross-Origin Resource Sharing
 CORS(app)
 
-@app.route("/info", methods=['POST'])
+# Per-endpoint request metrics, exposed at /metrics
+request_metrics = RequestMetrics()
+
+# Precompressed bodies of cacheable read responses (/info, /data), keyed on
+# ETag and content coding; cleared when the pod is reloaded
+response_cache = ResponseCache()
+
+# Slow-request profiling (see enable_request_profiling). cProfile can only run
+# one profile at a time, so concurrent requests are profiled one by one.
+_profile_threshold: Optional[float] = None
+_profile_dir: Optional[str] = None
+_profile_lock = threading.Lock()
+
+
+def enable_request_profiling(threshold: float, directory: str):
+    """
+    Profiles every request with cProfile and saves the stats of those taking
+    at least `threshold` seconds to `directory` (viewable with pstats/snakeviz).
+    """
+    global _profile_threshold, _profile_dir
+    os.makedirs(directory, exist_ok=True)
+    _profile_threshold = threshold
+    _profile_dir = directory
+
+
+def _phase(name: str):
+    """Times a phase of the current request (no-op outside a request)."""
+    timer = g.get('timer')
+    return timer.phase(name) if timer is not None else contextlib.nullcontext()
+
+
+def _get_json():
+    """Parses the request's JSON body, timed as the 'parse' phase."""
+    with _phase('parse'):
+        return request.get_json()
+
+
+def _respond(payload):
+    """Serializes a JSON response, timed as the 'serialization' phase."""
+    with _phase('serialization'):
+        return jsonify(payload)
+
+
+def _read_response(pod: TSPod, endpoint: str, params: dict, build, cacheable: bool = True) -> Response:
+    """
+    Serves a read endpoint with conditional requests and compression.
+
+    The ETag depends on the pod version, the file it was loaded from and
+    `params`, so a matching If-None-Match on a GET (or HEAD) is answered with
+    a 304 before `build` runs; other methods always get the body (RFC 9110
+    only allows 304 for GET and HEAD). Otherwise the JSON body is compressed with the negotiated
+    coding and, if `cacheable`, kept in `response_cache` so repeat requests
+    skip building and compressing.
+    Clients must revalidate (Cache-Control: no-cache) because the pod can be
+    reloaded at any time.
+    """
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    etag = make_etag(pod.name, pod.version, pod.shape, pod.source_stat, endpoint, params) if cacheable else None
+
+    conditional = request.method in ('GET', 'HEAD')
+    if etag is not None and conditional and etag_matches(request.headers.get('If-None-Match'), etag):
+        response = Response(status=304)
+    else:
+        cached = response_cache.get(etag, encoding) if etag is not None else None
+        if cached is not None:
+            body, applied_encoding = cached
+        else:
+            with _phase('compute'):
+                payload = build()
+            with _phase('serialization'):
+                body = app.json.dumps(payload).encode()
+                applied_encoding = encoding if len(body) >= MIN_COMPRESS_BYTES else None
+                body = compress(body, applied_encoding)
+            if etag is not None:
+                response_cache.put(etag, encoding, body, applied_encoding)
+        response = Response(body, mimetype='application/json')
+        if applied_encoding is not None:
+            response.headers['Content-Encoding'] = applied_encoding
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    if etag is not None:
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.before_request
+def _start_request_timer():
+    g.timer = RequestTimer()
+    if _profile_threshold is not None and _profile_lock.acquire(blocking=False):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+
+    timer = g.pop('timer', None)
+    if timer is None:
+        return response
+    duration, phases = timer.finish()
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    request_metrics.observe(endpoint, request.method, response.status_code, duration, phases,
+                            response.calculate_content_length() or 0)
+    response.headers['Server-Timing'] = server_timing_header(duration, phases)
+
+    if profiler is not None and duration >= _profile_threshold:
+        file_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint.strip('/').replace('/', '_') or 'root'}-{duration * 1000:.0f}ms.prof"
+        profiler.dump_stats(os.path.join(_profile_dir, file_name))
+        request_metrics.record_profile()
+        print(f"🐢 Slow request {endpoint} took {duration:.3f}s; profile saved to '{file_name}'")
+    return response
+
+
+@app.route("/metrics", methods=['GET'])
+def get_metrics():
+    """
+    Endpoint exposing request counters, latency histograms, per-phase timings,
+    response sizes and memory usage in the Prometheus text format.
+    """
+    return Response(request_metrics.render_prometheus() + response_cache.render_prometheus(),
+                    mimetype='text/plain; version=0.0.4')
+
+
+def _parse_group_labels(data: dict, n_series: int) -> np.ndarray:
+    """
+    Builds a 0/1 group label array of length N from a request body.
+    Accepts either 'group_labels' (list of N 0s and 1s) or 'selected_indices'
+    (list of selected series indices).
+    """
+    if data.get('group_labels') is not None:
+        group_labels = np.asarray(data['group_labels'])
+        if group_labels.shape != (n_series,):
+            raise ValueError(f"group_labels length ({group_labels.size}) does not match number of series ({n_series})")
+        return (group_labels == 1).astype(np.intp)
+
+    if data.get('selected_indices') is not None:
+        indices = np.asarray(data['selected_indices'], dtype=np.intp)
+        if indices.size and (indices.min() < 0 or indices.max() >= n_series):
+            raise ValueError(f"selected_indices must be in the range [0, {n_series})")
+        group_labels = np.zeros(n_series, dtype=np.intp)
+        group_labels[indices] = 1
+        return group_labels
+
+    raise ValueError("Missing required field: 'group_labels' or 'selected_indices'")
+
+
+@app.route("/info", methods=['GET', 'POST'])
 def get_pod_info():
     """
     Endpoint to get high-level metadata about the loaded TSPod.
+    Supports ETag/If-None-Match revalidation and compressed responses.
     """
-    global tspod
-    if tspod is None:
+    pod = tspod
+    if pod is None:
         return jsonify({"error": "TSPod is not loaded on the server."}), 500
     
     # Use the get_info() method we created for the TSPod class
-    info_dict = tspod.get_info()
-    return jsonify(info_dict)
+    return _read_response(pod, '/info', {}, pod.get_info)
+
+
+def _parse_data_params() -> dict:
+    """
+    Reads the /data parameters from the JSON body (POST) or the query string
+    (GET, with 'indices' as a comma-separated list) and normalizes them.
+    """
+    if request.method == 'GET':
+        args = request.args
+        indices = args.get('indices')
+        data = {
+            'max_series': args.get('max_series'),
+            'seed': args.get('seed'),
+            'indices': [int(i) for i in indices.split(',') if i.strip()] if indices is not None else None,
+            'compact': args.get('compact', '').lower() in ('1', 'true', 'yes'),
+        }
+    else:
+        data = _get_json() or {}
 
+    params = {}
+    for key in ('max_series', 'seed'):
+        value = data.get(key)
+        if value is not None:
+            try:
+                value = int(value)
+            except (ValueError, TypeError):
+                raise ValueError(f"Invalid '{key}' parameter: '{value}'. Must be an integer.")
+        params[key] = value
+    indices = data.get('indices')
+    params['indices'] = [int(i) for i in indices] if indices is not None else None
+    params['compact'] = bool(data.get('compact', False))
+    return params
 
-@app.route("/data", methods=['POST'])
+
+@app.route("/data", methods=['GET', 'POST'])
 def get_pod_data():
     """
     Endpoint to get the main data payload from the TSPod.
-    Accepts an optional 'max_series' parameter in the JSON body to sample the data.
+    Accepts an optional 'max_series' parameter to sample the data, an optional
+    'seed' making that sample reproducible, optional 'indices' to restrict
+    the payload to a selection of series, and 'compact' to receive the series
+    in the pod's stored precision (see TSPod.get_data_payload). Parameters come from the JSON body
+    (POST) or the query string (GET).
+
+    Responses are compressed when the client accepts it. Deterministic
+    payloads (no sampling, or a seeded sample) carry an ETag, are cached
+    precompressed and can be revalidated with If-None-Match.
     """
-    global tspod
-    if tspod is None:
+    pod = tspod
+    if pod is None:
         return jsonify({"error": "TSPod is not loaded on the server."}), 500
 
-    # Get 'max_series' from JSON body
-    data = request.get_json() or {}
-    max_series = data.get('max_series', None)
-    print(f"Received max_series: {max_series}")
-    
-    if max_series is not None:
-        try:
-            max_series = int(max_series)
-            print(f"Converted max_series to int: {max_series}")
-        except (ValueError, TypeError):
+    try:
+        params = _parse_data_params()
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    max_series = params['max_series']
+    n_candidates = len(params['indices']) if params['indices'] is not None else pod.shape[0]
+    cacheable = max_series is None or max_series >= n_candidates or params['seed'] is not None
+
+    # Use the get_data_payload() method with the optional sampling parameter
+    try:
+        return _read_response(pod, '/data', params, lambda: pod.get_data_payload(**params), cacheable=cacheable)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid 'indices' parameter: {str(e)}"}), 400
+
+
+@app.route("/tiles", methods=['POST'])
+def get_density_tile():
+    """
+    Endpoint to get one density tile of the 2D projection.
+    Expects JSON payload with:
+    - 'zoom', 'x', 'y': Tile address (zoom 0 is a single tile covering all points)
+    - 'variable': Optional categorical variable to split the counts by
+    - 'labels_key' and 'labels': Optional N integer labels to split the counts by
+      instead, e.g. the clustering_result 'values' of /clustering run on the
+      full projection. Send 'labels' once; later tiles only need 'labels_key'.
+    - 'point_threshold': Include individual points when the tile holds at most
+      this many (default: 1000)
+    """
+    pod = tspod
+    if pod is None:
+        return jsonify({"error": "TSPod is not loaded on the server."}), 500
+
+    try:
+        data = _get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        if any(data.get(field) is None for field in ('zoom', 'x', 'y')):
+            return jsonify({"error": "Missing required fields: 'zoom', 'x' and 'y'"}), 400
+
+        with _phase('compute'):
+            tile = pod.get_density_tile(
+                int(data['zoom']),
+                int(data['x']),
+                int(data['y']),
+                variable=data.get('variable'),
+                point_threshold=int(data.get('point_threshold', 1000)),
+                labels=data.get('labels'),
+                labels_key=data.get('labels_key')
+            )
+        return _respond(tile)
+
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error computing density tile: {str(e)}"}), 500
+
+
+@app.route("/similarity", methods=['POST'])
+def find_similar_series():
+    """
+    Endpoint to find the series most similar to a query series.
+    Expects JSON payload with:
+    - 'index' (series index in the pod) or 'query' (T x D nested list, or T values
+      for univariate pods)
+    - 'k': Number of neighbours (default: 10)
+    - 'metric': 'euclidean' or 'dtw' (default: 'euclidean'), on z-normalized series
+    - 'window': Optional DTW band half-width in timesteps
+    """
+    pod = tspod
+    if pod is None:
+        return jsonify({"error": "TSPod is not loaded on the server."}), 500
+
+    try:
+        data = _get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        if data.get('index') is None and data.get('query') is None:
+            return jsonify({"error": "Missing required field: 'index' or 'query'"}), 400
+
+        window = data.get('window')
+        with _phase('compute'):
+            result = pod.find_similar(
+                query=data.get('query'),
+                index=int(data['index']) if data.get('index') is not None else None,
+                k=int(data.get('k', 10)),
+                metric=data.get('metric', 'euclidean'),
+                window=int(window) if window is not None else None
+            )
+        return _respond(result)
+
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error performing similarity search: {str(e)}"}), 500
+
+
+@app.route("/selection", methods=['POST'])
+def select_points():
+    """
+    Endpoint to select series by their position in the 2D projection.
+    Expects JSON payload with 'shape' and shape-specific fields:
+    - 'rectangle': 'bounds' as [xmin, ymin, xmax, ymax]
+    - 'polygon': 'vertices' as a list of [x, y] points (e.g. a lasso)
+    - 'knn': 'point' as [x, y] or 'index' of a series, and 'k' (default: 10)
+    Returns the selected series indices, which can be passed as 'indices' to /data
+    or as 'selected_indices' to /summary and the statistical test endpoints.
+    """
+    pod = tspod
+    if pod is None:
+        return jsonify({"error": "TSPod is not loaded on the server."}), 500
+
+    try:
+        data = _get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        shape = data.get('shape')
+        with _phase('compute'):
+            index = pod.spatial_index
+
+        if shape == 'rectangle':
+            bounds = data.get('bounds')
+            if not isinstance(bounds, list) or len(bounds) != 4:
+                return jsonify({"error": "'bounds' must be a list [xmin, ymin, xmax, ymax]"}), 400
+            with _phase('compute'):
+                indices = index.query_rectangle(*[float(b) for b in bounds])
+        elif shape == 'polygon':
+            with _phase('compute'):
+                indices = index.query_polygon(data.get('vertices'))
+        elif shape == 'knn':
+            if data.get('index') is not None:
+                series_index = int(data['index'])
+                if not 0 <= series_index < pod.shape[0]:
+                    raise ValueError(f"'index' must be in the range [0, {pod.shape[0]}).")
+                point = pod.projection[series_index]
+            elif data.get('point') is not None:
+                point = data['point']
+            else:
+                return jsonify({"error": "Missing required field: 'point' or 'index'"}), 400
+            with _phase('compute'):
+                indices = index.query_knn(point, k=int(data.get('k', 10)))
+        else:
             return jsonify({
-                "error": f"Invalid 'max_series' parameter: '{max_series}'. Must be an integer."
+                "error": f"Unsupported shape: {shape}. Use 'rectangle', 'polygon' or 'knn'"
             }), 400
-    
-    # Use the get_data_payload() method with the optional sampling parameter
-    data_payload = tspod.get_data_payload(max_series=max_series)
-    return jsonify(data_payload)
+
+        return _respond({
+            "shape": shape,
+            "indices": indices.tolist(),
+            "n_selected": int(indices.size)
+        })
+
+    except (ValueError, TypeError, IndexError) as e:
+        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error performing selection: {str(e)}"}), 500
+
+
+@app.route("/summary", methods=['POST'])
+def get_selection_summary():
+    """
+    Endpoint to get per-timestep, per-dimension summary statistics of a selection.
+    Expects JSON payload with:
+    - 'selected_indices' (list of series indices) or 'group_labels' (list of N 0s and 1s)
+    - 'quantiles': Optional list of quantile levels (default: 0.05, 0.25, 0.5, 0.75, 0.95)
+    - 'include_complement': Also summarize the non-selected series (default: true)
+    """
+    pod = tspod
+    if pod is None:
+        return jsonify({"error": "TSPod is not loaded on the server."}), 500
+
+    try:
+        data = _get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        indices = np.flatnonzero(_parse_group_labels(data, pod.shape[0]))
+        kwargs = {'include_complement': bool(data.get('include_complement', True))}
+        if data.get('quantiles') is not None:
+            kwargs['quantiles'] = data['quantiles']
+
+        with _phase('compute'):
+            summary = pod.get_selection_summary(indices, **kwargs)
+        return _respond(summary)
+
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error computing selection summary: {str(e)}"}), 500
+
+
+def _variable_test_inputs(pod: TSPod, data: dict, var_type: str, values_key: str):
+    """
+    Resolves the (values, group_labels) of a single-variable test. Clients either
+    send '<values_key>' with matching 'group_labels', or name one of the pod's
+    variables with 'variable_name' and the selection as 'group_labels' or
+    'selected_indices', so the values never have to be downloaded.
+    """
+    variable_name = data.get('variable_name', 'Unknown Variable')
+    values = data.get(values_key)
+    if values is None:
+        var_meta = pod.series_variables.get(variable_name)
+        if var_meta is None:
+            raise ValueError(f"Missing required field: '{values_key}' or the 'variable_name' of a pod variable")
+        if var_meta['type'] != var_type:
+            raise ValueError(f"Variable '{variable_name}' is not {var_type}")
+        return var_meta['values'], _parse_group_labels(data, pod.shape[0]), variable_name
+
+    group_labels = data.get('group_labels')
+    if group_labels is None:
+        raise ValueError(f"Missing required fields: '{values_key}' and 'group_labels'")
+    # Validate that the values and group_labels have the same length
+    if len(group_labels) != len(values):
+        raise ValueError(f"group_labels length ({len(group_labels)}) does not match {values_key} length ({len(values)})")
+    return values, group_labels, variable_name
 
 
 @app.route("/statistical_tests/numerical", methods=['POST'])
 def numerical_statistical_tests():
     """
     Endpoint to perform statistical tests on numerical variables.
-    Expects JSON payload with 'values' (list of numerical values) and 'group_labels' (list of 0s and 1s).
+    Expects JSON payload with either:
+    - 'values' (list of numerical values) and 'group_labels' (list of 0s and 1s), or
+    - 'variable_name' of a numerical pod variable and 'selected_indices'
+      (or N-length 'group_labels')
     """
-    global tspod
-    if tspod is None:
+    pod = tspod
+    if pod is None:
         return jsonify({"error": "TSPod is not loaded on the server."}), 500
 
     try:
-        data = request.get_json()
+        data = _get_json()
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
-        values = data.get('values')
-        group_labels = data.get('group_labels')
-        variable_name = data.get('variable_name', 'Unknown Variable')
-        
-        if values is None or group_labels is None:
-            return jsonify({
-                "error": "Missing required fields: 'values' and 'group_labels'"
-            }), 400
-        
-        # Validate that values and group_labels have the same length
-        if len(group_labels) != len(values):
-            return jsonify({
-                "error": f"group_labels length ({len(group_labels)}) does not match values length ({len(values)})"
-            }), 400
+        try:
+            values, group_labels, variable_name = _variable_test_inputs(pod, data, 'numerical', 'values')
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": str(e)}), 400
         
         # Run statistical tests
-        results = run_numerical_tests(values, group_labels)
+        with _phase('compute'):
+            results = run_numerical_tests(values, group_labels)
         results['variable_name'] = variable_name
         
-        return jsonify(results)
+        return _respond(results)
         
     except Exception as e:
         return jsonify({"error": f"Error performing numerical statistical tests: {str(e)}"}), 500
@@ -100,42 +503,113 @@ def numerical_statistical_tests():
 def categorical_statistical_tests():
     """
     Endpoint to perform statistical tests on categorical variables.
-    Expects JSON payload with 'categories' (list of category values) and 'group_labels' (list of 0s and 1s).
+    Expects JSON payload with either:
+    - 'categories' (list of category values) and 'group_labels' (list of 0s and 1s), or
+    - 'variable_name' of a categorical pod variable and 'selected_indices'
+      (or N-length 'group_labels'); categories are then its integer codes,
+      as in /statistical_tests/ranking
     """
-    global tspod
-    if tspod is None:
+    pod = tspod
+    if pod is None:
         return jsonify({"error": "TSPod is not loaded on the server."}), 500
 
     try:
-        data = request.get_json()
+        data = _get_json()
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
-        categories = data.get('categories')
-        group_labels = data.get('group_labels')
-        variable_name = data.get('variable_name', 'Unknown Variable')
-        
-        if categories is None or group_labels is None:
-            return jsonify({
-                "error": "Missing required fields: 'categories' and 'group_labels'"
-            }), 400
-        
-        # Validate that categories and group_labels have the same length
-        if len(group_labels) != len(categories):
-            return jsonify({
-                "error": f"group_labels length ({len(group_labels)}) does not match categories length ({len(categories)})"
-            }), 400
+        try:
+            categories, group_labels, variable_name = _variable_test_inputs(pod, data, 'categorical', 'categories')
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": str(e)}), 400
         
         # Run statistical tests
-        results = run_categorical_tests(categories, group_labels)
+        with _phase('compute'):
+            results = run_categorical_tests(categories, group_labels)
         results['variable_name'] = variable_name
         
-        return jsonify(results)
+        return _respond(results)
         
     except Exception as e:
         return jsonify({"error": f"Error performing categorical statistical tests: {str(e)}"}), 500
 
 
+@app.route("/statistical_tests/ranking", methods=['POST'])
+def ranking_statistical_tests():
+    """
+    Endpoint to rank the pod's series variables by how strongly they separate a selection.
+    Expects JSON payload with:
+    - 'group_labels' (list of N 0s and 1s) or 'selected_indices' (list of series indices)
+    - 'k': Number of top variables to run the full tests on (default: 10)
+    - 'variables': Optional list of variable names to rank (default: all)
+    - 'alpha': Significance level for the adjusted p-values (default: 0.05)
+    """
+    pod = tspod
+    if pod is None:
+        return jsonify({"error": "TSPod is not loaded on the server."}), 500
+
+    try:
+        data = _get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        group_labels = _parse_group_labels(data, pod.shape[0])
+        with _phase('compute'):
+            results = rank_variables(
+                pod.series_variables,
+                group_labels,
+                k=int(data.get('k', 10)),
+                variable_names=data.get('variables'),
+                alpha=float(data.get('alpha', 0.05))
+            )
+
+        return _respond(results)
+
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error ranking variables: {str(e)}"}), 500
+
+
+@app.route("/statistical_tests/temporal", methods=['POST'])
+def temporal_statistical_tests():
+    """
+    Endpoint to test where in time, and in which dimension, a selection differs
+    from the remaining series.
+    Expects JSON payload with:
+    - 'group_labels' (list of N 0s and 1s) or 'selected_indices' (list of series indices)
+    - 'correction': 'fdr_bh', 'bonferroni' or 'cluster' (default: 'fdr_bh')
+    - 'alpha': Significance level (default: 0.05)
+    - 'n_permutations': Permutations for the cluster correction (default: 500)
+    """
+    pod = tspod
+    if pod is None:
+        return jsonify({"error": "TSPod is not loaded on the server."}), 500
+
+    try:
+        data = _get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+
+        group_labels = _parse_group_labels(data, pod.shape[0])
+        with _phase('compute'):
+            results = temporal_difference_test(
+                pod.data,
+                group_labels,
+                correction=data.get('correction', 'fdr_bh'),
+                alpha=float(data.get('alpha', 0.05)),
+                n_permutations=int(data.get('n_permutations', 500))
+            )
+        results['dimensions'] = pod.dimension_names
+
+        return _respond(results)
+
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error performing temporal statistical tests: {str(e)}"}), 500
+
+
 @app.route("/clustering", methods=['POST'])
 def perform_clustering():
     """
@@ -153,12 +627,12 @@ def perform_clustering():
     - 'eps': Maximum distance between samples (default: auto-estimated)
     - 'min_samples': Minimum samples in neighborhood (default: 5)
     """
-    global tspod
-    if tspod is None:
+    pod = tspod
+    if pod is None:
         return jsonify({"error": "TSPod is not loaded on the server."}), 500
 
     try:
-        data = request.get_json()
+        data = _get_json()
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
@@ -190,7 +664,8 @@ def perform_clustering():
             # If eps is not provided, estimate it
             if 'eps' not in data:
                 try:
-                    estimated_eps = estimate_dbscan_eps(projection_data)
+                    with _phase('compute'):
+                        estimated_eps = estimate_dbscan_eps(projection_data)
                     kwargs['eps'] = estimated_eps
                 except Exception as e:
                     # Fall back to default if estimation fails
@@ -200,7 +675,8 @@ def perform_clustering():
             kwargs['min_samples'] = data.get('min_samples', 5)
         
         # Perform clustering
-        clustering_result = get_clustering_result(projection_data, algorithm, **kwargs)
+        with _phase('compute'):
+            clustering_result = get_clustering_result(projection_data, algorithm, **kwargs)
         
         # Add metadata about the clustering
         result = {
@@ -210,7 +686,7 @@ def perform_clustering():
             'n_points': len(projection_data)
         }
         
-        return jsonify(result)
+        return _respond(result)
         
     except ValueError as e:
         return jsonify({"error": f"Invalid parameters: {str(e)}"}), 400
@@ -218,22 +694,169 @@ def perform_clustering():
         return jsonify({"error": f"Error performing clustering: {str(e)}"}), 500
 
 
-def init_server(pod_path: str, host: str = "127.0.0.1", port: int = 5000):
+class PodWatcher(threading.Thread):
+    """
+    Background thread that reloads the pod when its file changes (e.g. after
+    `TSPod.append_to_file`) and swaps it in atomically.
+
+    The file's identity (inode, size, mtime) is polled every `interval` seconds.
+    A change is only acted on once it has been stable for one full interval, the
+    new pod is loaded entirely in this thread, and only then is the global
+    reference replaced, so requests never see a half-loaded pod.
+
+    The pod must be replaced, not rewritten in place: `TSPod.save`,
+    `TSPod.append_to_file` and `TSPodBuilder.finalize` all write a new file and
+    rename it over the old one. With memory-mapped pods, a file truncated in
+    place (e.g. copied over with `cp`) invalidates the mapping that in-flight
+    requests are still reading and can crash the server with SIGBUS.
+    """
+    def __init__(self, pod_path: str, mmap_mode: str = None, interval: float = 2.0,
+                 loaded_stat: Optional[tuple] = None):
+        super().__init__(daemon=True)
+        self.pod_path = pod_path
+        self.mmap_mode = mmap_mode
+        self.interval = interval
+        self._stop_event = threading.Event()
+        # Identity of the file the served pod was loaded from (TSPod.source_stat);
+        # stat-ing now instead would miss a replacement made since that load
+        self._loaded_stat = loaded_stat if loaded_stat is not None else self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.pod_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        global tspod
+        pending = None
+        while not self._stop_event.wait(self.interval):
+            current = self._stat()
+            if current is None or current == self._loaded_stat:
+                pending = None
+                continue
+            if current != pending:
+                if self.mmap_mode is not None and self._loaded_stat is not None and current[0] == self._loaded_stat[0]:
+                    print(f"⚠️ '{self.pod_path}' was rewritten in place while memory-mapped; "
+                          "replace it atomically (write a new file and rename it) instead.")
+                # Wait one more interval to make sure the writer has finished
+                pending = current
+                continue
+            try:
+                new_pod = TSPod.load(self.pod_path, mmap_mode=self.mmap_mode)
+            except Exception as e:
+                print(f"⚠️ Could not reload TSPod from '{self.pod_path}': {e}")
+                pending = None
+                continue
+            tspod = new_pod
+            response_cache.clear()
+            self._loaded_stat = new_pod.source_stat
+            pending = None
+            print(f"🔄 TSPod reloaded (version {new_pod.version}, shape {new_pod.shape}).")
+
+
+# Heavy dependencies are imported lazily by the modules that need them;
+# warm_up() imports them ahead of the first request that would.
+WARM_UP_MODULES = [
+    'scipy.stats',
+    'scipy.spatial',
+    'sklearn.cluster',
+    'sklearn.neighbors',
+    'sklearn.decomposition',
+]
+
+HEAVY_MODULES = ['scipy', 'sklearn', 'pandas', 'sktime']
+
+
+def warm_up(timings: Optional[Dict[str, float]] = None):
+    """
+    Imports the heavy dependencies used by the statistics, clustering and
+    projection endpoints, recording each import's duration in `timings`.
+    """
+    for module_name in WARM_UP_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            print(f"⚠️ Warm-up could not import '{module_name}': {e}")
+            continue
+        if timings is not None:
+            timings[f"warm_up {module_name}"] = time.perf_counter() - start
+
+
+def print_startup_profile(timings: Dict[str, float]):
+    """Prints a startup time breakdown and which heavy modules are already imported."""
+    print("⏱️ Startup profile:")
+    for phase, seconds in timings.items():
+        print(f"   - {phase:<36} {seconds * 1000:9.1f} ms")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"   - heavy modules imported: {', '.join(loaded) if loaded else 'none'}")
+
+
+def init_server(pod_path: str, host: str = "127.0.0.1", port: int = 5000, mmap: bool = False,
+                watch: bool = False, watch_interval: float = 2.0, warm: bool = False,
+                startup_timings: Optional[Dict[str, float]] = None,
+                profile_requests: Optional[float] = None, profile_dir: str = "timelens_profiles",
+                response_cache_bytes: int = 256 * 1024 ** 2):
     """
     Loads the TSPod from a file and starts the Flask server.
+    If `mmap` is True, the series data is memory-mapped instead of read into RAM.
+    If `watch` is True, the pod file is polled every `watch_interval` seconds and
+    reloaded without restarting the server when it changes.
+    If `warm` is True, heavy dependencies are imported in a background thread
+    once the server socket is bound.
+    If `startup_timings` is given (phase name -> seconds, e.g. from the CLI),
+    the pod load and bind times are added to it and the breakdown is printed.
+    If `profile_requests` is given, requests slower than that many seconds are
+    profiled with cProfile and saved to `profile_dir`.
+    Compressed /info and /data bodies are cached up to `response_cache_bytes`.
     """
     global tspod
+    profile = startup_timings is not None
     print(f"🚀 Loading TSPod from '{pod_path}'...")
     try:
         # Load the single TSPod object into our global variable
-        tspod = TSPod.load(pod_path)
+        start = time.perf_counter()
+        tspod = TSPod.load(pod_path, mmap_mode='r' if mmap else None)
+        if profile:
+            startup_timings["load pod"] = time.perf_counter() - start
         print("✅ TSPod loaded successfully.")
         print(f"   - Name: {tspod.name}")
         print(f"   - Shape: {tspod.shape}")
+
+        response_cache.max_bytes = response_cache_bytes
+
+        if profile_requests is not None:
+            enable_request_profiling(profile_requests, profile_dir)
+            print(f"🔬 Profiling requests slower than {profile_requests}s into '{profile_dir}'")
+
+        if watch:
+            PodWatcher(pod_path, mmap_mode='r' if mmap else None, interval=watch_interval,
+                       loaded_stat=tspod.source_stat).start()
+            print(f"👀 Watching '{pod_path}' for changes every {watch_interval}s")
+
+        start = time.perf_counter()
+        server = make_server(host, port, app, threaded=True)
+        if profile:
+            startup_timings["bind server"] = time.perf_counter() - start
+            print_startup_profile(startup_timings)
+
+        if warm:
+            def _warm_up():
+                warm_up_timings = {} if profile else None
+                warm_up(warm_up_timings)
+                if profile:
+                    print_startup_profile(warm_up_timings)
+            threading.Thread(target=_warm_up, daemon=True).start()
+
         print(f"🌍 Starting server at http://{host}:{port}")
         
         # Start the Flask web server
-        app.run(host=host, port=port, debug=False)
+        server.serve_forever()
         
     except FileNotFoundError:
         print(f"❌ Error: TSPod file not found at '{pod_path}'")
@@ -0,0 +1,205 @@
+# timelens/similarity.py
+"""
+k-nearest-neighbour similarity search over raw series with lower-bound pruning.
+"""
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+
+def _segment_bounds(n_timesteps: int, n_segments: int) -> np.ndarray:
+    """Start offsets of the PAA segments plus the final end offset."""
+    return np.linspace(0, n_timesteps, n_segments + 1).round().astype(np.intp)
+
+
+def _znormalize(series: np.ndarray, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+    """Z-normalizes (..., T, D) series with per-series, per-dimension statistics."""
+    return (series - mean[..., None, :]) / std[..., None, :]
+
+
+def _series_stats(series: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-dimension mean and std along T; constant dimensions get std 1."""
+    mean = series.mean(axis=-2)
+    std = series.std(axis=-2)
+    return mean, np.where(std > 0, std, 1.0)
+
+
+def _dtw_squared(query: np.ndarray, candidates: np.ndarray, window: int) -> np.ndarray:
+    """
+    Squared multivariate (dependent) DTW between one (T, D) query and a batch of
+    (B, T, D) candidates under a Sakoe-Chiba band.
+
+    Cells on the same anti-diagonal do not depend on each other, so the
+    recurrence is evaluated one anti-diagonal at a time, vectorized over the
+    cells of the band and over the whole batch.
+    """
+    n_batch, n_timesteps, _ = candidates.shape
+    # Diagonal buffers are indexed by the query position i (0..T)
+    prev2 = np.full((n_batch, n_timesteps + 1), np.inf)
+    prev1 = np.full((n_batch, n_timesteps + 1), np.inf)
+    prev2[:, 0] = 0.0  # D(0, 0)
+    for s in range(2, 2 * n_timesteps + 1):
+        lo = max(1, s - n_timesteps, (s - window + 1) // 2)
+        hi = min(n_timesteps, s - 1, (s + window) // 2)
+        current = np.full((n_batch, n_timesteps + 1), np.inf)
+        if lo <= hi:
+            i = np.arange(lo, hi + 1)
+            j = s - i
+            cost = ((query[i - 1][None] - candidates[:, j - 1]) ** 2).sum(axis=-1)
+            best = np.minimum(np.minimum(prev2[:, i - 1], prev1[:, i - 1]), prev1[:, i])
+            current[:, i] = cost + best
+        prev2, prev1 = prev1, current
+    return prev1[:, n_timesteps]
+
+
+class SimilarityIndex:
+    """
+    A PAA (piecewise aggregate approximation) index over z-normalized series.
+
+    Each series is z-normalized per dimension and reduced to `n_segments`
+    segment means per dimension. A query first computes a lower bound of its
+    distance to every series from these small summaries (LB_PAA for Euclidean,
+    the PAA envelope bound of LB_Keogh for DTW), then refines candidates in
+    increasing lower-bound order, reading raw series from `data` only until the
+    next lower bound exceeds the current k-th best distance.
+
+    Attributes:
+        paa (np.ndarray): Segment means of shape (N, n_segments, D).
+        mean (np.ndarray): Per-series, per-dimension means of shape (N, D).
+        std (np.ndarray): Per-series, per-dimension stds of shape (N, D).
+    """
+    def __init__(self, paa: np.ndarray, mean: np.ndarray, std: np.ndarray, n_timesteps: int):
+        self.paa = paa
+        self.mean = mean
+        self.std = std
+        self.n_timesteps = n_timesteps
+        bounds = _segment_bounds(n_timesteps, paa.shape[1])
+        self._bounds = bounds
+        self._lengths = np.diff(bounds).astype(np.float64)
+
+    @classmethod
+    def build(cls,
+              data: np.ndarray,
+              n_segments: int = 16,
+              max_chunk_bytes: int = 64 * 1024 ** 2) -> 'SimilarityIndex':
+        """
+        Builds the index from (N, T, D) data, reading it in blocks of series so
+        memory-mapped pods are never fully loaded.
+        """
+        n_series, n_timesteps, n_dims = data.shape
+        n_segments = int(max(1, min(n_segments, n_timesteps)))
+        bounds = _segment_bounds(n_timesteps, n_segments)
+
+        paa = np.empty((n_series, n_segments, n_dims), dtype=np.float32)
+        mean = np.empty((n_series, n_dims))
+        std = np.empty((n_series, n_dims))
+        step = int(max(1, max_chunk_bytes // max(1, n_timesteps * n_dims * 8)))
+        for start in range(0, n_series, step):
+            rows = slice(start, min(start + step, n_series))
+            block = np.asarray(data[rows], dtype=np.float64)
+            mean[rows], std[rows] = _series_stats(block)
+            normalized = _znormalize(block, mean[rows], std[rows])
+            paa[rows] = np.add.reduceat(normalized, bounds[:-1], axis=1) / np.diff(bounds)[None, :, None]
+        return cls(paa, mean, std, n_timesteps)
+
+    def _paa(self, series: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(series, self._bounds[:-1], axis=0) / self._lengths[:, None]
+
+    def _lower_bounds(self, query: np.ndarray, metric: str, window: int) -> np.ndarray:
+        """Squared lower bounds of the query's distance to every indexed series."""
+        # The summaries are float32; a small relative margin keeps rounding
+        # from ever pushing a bound above the true distance
+        weights = self._lengths[None, :, None] * (1 - 1e-5)
+        if metric == 'euclidean':
+            return (weights * (self.paa - self._paa(query)[None]) ** 2).sum(axis=(1, 2))
+
+        upper, lower = self._envelope(query, window)
+        upper = np.maximum.reduceat(upper, self._bounds[:-1], axis=0)[None]
+        lower = np.minimum.reduceat(lower, self._bounds[:-1], axis=0)[None]
+        excess = np.where(self.paa > upper, self.paa - upper, np.where(self.paa < lower, lower - self.paa, 0.0))
+        return (weights * excess ** 2).sum(axis=(1, 2))
+
+    @staticmethod
+    def _envelope(query: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Running max/min of the query over +/- window timesteps."""
+        padded = np.pad(query, ((window, window), (0, 0)), mode='edge')
+        views = np.lib.stride_tricks.sliding_window_view(padded, 2 * window + 1, axis=0)
+        return views.max(axis=-1), views.min(axis=-1)
+
+    def search(self,
+               data: np.ndarray,
+               query: np.ndarray,
+               k: int = 10,
+               metric: str = 'euclidean',
+               window: Optional[int] = None,
+               exclude: Optional[int] = None,
+               batch_size: int = 256) -> Dict[str, Any]:
+        """
+        Finds the k series most similar to a (T, D) query.
+
+        Args:
+            data: The (N, T, D) array the index was built from.
+            query: Raw (not normalized) query series of shape (T, D).
+            k: Number of neighbours to return.
+            metric: 'euclidean' or 'dtw' (both on z-normalized series).
+            window: Sakoe-Chiba band half-width for DTW (default: 10% of T).
+            exclude: Optional series index to leave out (e.g. the query itself).
+            batch_size: Number of candidates refined per step.
+
+        Returns:
+            Dictionary with the neighbour indices and distances (closest first)
+            and how many series had to be refined against the raw data.
+        """
+        if metric not in ('euclidean', 'dtw'):
+            raise ValueError(f"Unsupported metric: {metric}. Use 'euclidean' or 'dtw'")
+        query = np.asarray(query, dtype=np.float64)
+        if query.shape != (self.n_timesteps, self.paa.shape[2]):
+            raise ValueError(f"Query must have shape ({self.n_timesteps}, {self.paa.shape[2]}), got {query.shape}.")
+        if k < 1:
+            raise ValueError("k must be >= 1")
+        if window is None:
+            window = max(1, int(round(0.1 * self.n_timesteps)))
+
+        query_mean, query_std = _series_stats(query)
+        query = _znormalize(query, query_mean, query_std)
+
+        lower_bounds = self._lower_bounds(query, metric, window)
+        if exclude is not None:
+            lower_bounds[exclude] = np.inf
+        order = np.argsort(lower_bounds, kind='stable')
+        k = min(k, int(np.isfinite(lower_bounds).sum()))
+
+        best_indices = np.empty(0, dtype=np.intp)
+        best_distances = np.empty(0)
+        n_refined = 0
+        for start in range(0, len(order), batch_size):
+            kth = best_distances[-1] if len(best_distances) == k else np.inf
+            batch = order[start:start + batch_size]
+            batch = batch[lower_bounds[batch] < kth]
+            if batch.size == 0:
+                break
+
+            batch = np.sort(batch)  # sequential reads from memory-mapped data
+            candidates = _znormalize(np.asarray(data[batch], dtype=np.float64), self.mean[batch], self.std[batch])
+            if metric == 'euclidean':
+                distances = ((candidates - query[None]) ** 2).sum(axis=(1, 2))
+            else:
+                # Full-resolution LB_Keogh prunes further before the exact DTW
+                upper, lower = self._envelope(query, window)
+                excess = np.maximum(candidates - upper[None], 0.0) + np.maximum(lower[None] - candidates, 0.0)
+                keep = (excess ** 2).sum(axis=(1, 2)) < kth
+                batch, candidates = batch[keep], candidates[keep]
+                distances = _dtw_squared(query, candidates, window) if batch.size else np.empty(0)
+            n_refined += int(batch.size)
+
+            merged_indices = np.concatenate([best_indices, batch])
+            merged_distances = np.concatenate([best_distances, distances])
+            top = np.argsort(merged_distances, kind='stable')[:k]
+            best_indices, best_distances = merged_indices[top], merged_distances[top]
+
+        return {
+            "metric": metric,
+            "indices": best_indices.tolist(),
+            "distances": np.sqrt(best_distances).tolist(),
+            "n_refined": n_refined,
+            "n_series": len(order)
+        }
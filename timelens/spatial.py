@@ -0,0 +1,109 @@
+# timelens/spatial.py
+"""
+Spatial index over the 2D projection for server-side selection and hit testing.
+"""
+import numpy as np
+from typing import Sequence
+
+
+class ProjectionIndex:
+    """
+    A uniform grid (for range queries) plus a lazily built KD-tree (for
+    nearest-neighbour queries) over an (N, 2) projection.
+
+    Points are sorted by grid cell id (row-major), so the cells of one grid row
+    that overlap a query rectangle form one contiguous slice of the sorted
+    order. Range queries therefore only touch the candidates near the query
+    instead of scanning all N points.
+
+    Attributes:
+        points (np.ndarray): The (N, 2) projection the index was built over.
+        grid_size (int): Number of cells along each axis.
+    """
+    def __init__(self, points: np.ndarray, points_per_cell: int = 16):
+        points = np.asarray(points)
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise ValueError("`points` must be an array of shape (N, 2).")
+
+        self.points = points
+        n_points = points.shape[0]
+        self.grid_size = int(max(1, np.ceil(np.sqrt(n_points / points_per_cell))))
+
+        self._min = points.min(axis=0) if n_points else np.zeros(2)
+        span = (points.max(axis=0) - self._min) if n_points else np.ones(2)
+        self._cell_size = np.where(span > 0, span / self.grid_size, 1.0)
+
+        cell_ids = self._cell_ids(points)
+        self._order = np.argsort(cell_ids, kind='stable')
+        counts = np.bincount(cell_ids, minlength=self.grid_size ** 2)
+        self._cell_start = np.concatenate(([0], np.cumsum(counts)))
+        self._kdtree = None
+
+    def _cells(self, coords: np.ndarray) -> np.ndarray:
+        """Clipped integer (cx, cy) cell coordinates of the given points."""
+        cells = np.floor((np.asarray(coords, dtype=np.float64) - self._min) / self._cell_size)
+        return np.clip(cells, 0, self.grid_size - 1).astype(np.intp)
+
+    def _cell_ids(self, coords: np.ndarray) -> np.ndarray:
+        cells = self._cells(coords)
+        return cells[..., 1] * self.grid_size + cells[..., 0]
+
+    def _candidates(self, xmin: float, ymin: float, xmax: float, ymax: float) -> np.ndarray:
+        """Indices of all points in the grid cells overlapping the rectangle."""
+        (cx0, cy0), (cx1, cy1) = self._cells([[xmin, ymin], [xmax, ymax]])
+        slices = []
+        for cy in range(cy0, cy1 + 1):
+            start = self._cell_start[cy * self.grid_size + cx0]
+            stop = self._cell_start[cy * self.grid_size + cx1 + 1]
+            if stop > start:
+                slices.append(self._order[start:stop])
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.intp)
+
+    def query_rectangle(self, xmin: float, ymin: float, xmax: float, ymax: float) -> np.ndarray:
+        """
+        Returns the sorted indices of all points inside the (inclusive) rectangle.
+        """
+        if xmin > xmax or ymin > ymax:
+            raise ValueError("Rectangle bounds must satisfy xmin <= xmax and ymin <= ymax.")
+        candidates = self._candidates(xmin, ymin, xmax, ymax)
+        x, y = self.points[candidates, 0], self.points[candidates, 1]
+        inside = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+        return np.sort(candidates[inside])
+
+    def query_polygon(self, vertices: Sequence[Sequence[float]]) -> np.ndarray:
+        """
+        Returns the sorted indices of all points inside a polygon (e.g. a lasso),
+        using the even-odd rule. The polygon is closed implicitly.
+        """
+        vertices = np.asarray(vertices, dtype=np.float64)
+        if vertices.ndim != 2 or vertices.shape[1] != 2 or vertices.shape[0] < 3:
+            raise ValueError("A polygon needs at least 3 [x, y] vertices.")
+
+        (xmin, ymin), (xmax, ymax) = vertices.min(axis=0), vertices.max(axis=0)
+        candidates = self._candidates(xmin, ymin, xmax, ymax)
+        x, y = self.points[candidates, 0], self.points[candidates, 1]
+
+        # Ray casting, vectorized over candidates, one edge at a time
+        inside = np.zeros(candidates.size, dtype=bool)
+        x_prev, y_prev = vertices[-1]
+        for x_curr, y_curr in vertices:
+            crosses = (y_curr > y) != (y_prev > y)
+            if np.any(crosses):
+                x_cross = x_curr + (y[crosses] - y_curr) * (x_prev - x_curr) / (y_prev - y_curr)
+                inside[crosses] ^= x[crosses] < x_cross
+            x_prev, y_prev = x_curr, y_curr
+        return np.sort(candidates[inside])
+
+    def query_knn(self, point: Sequence[float], k: int = 10) -> np.ndarray:
+        """
+        Returns the indices of the k points nearest to `point`, closest first.
+        """
+        from scipy.spatial import cKDTree
+
+        if k < 1:
+            raise ValueError("k must be >= 1")
+        if self._kdtree is None:
+            self._kdtree = cKDTree(self.points)
+        k = min(k, self.points.shape[0])
+        _, indices = self._kdtree.query(np.asarray(point, dtype=np.float64), k=k)
+        return np.atleast_1d(indices).astype(np.intp)
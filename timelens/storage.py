@@ -1,6 +1,85 @@
 import numpy as np
-from typing import Dict, List, Optional, Any
-from timelens.utils import project_mts
+import os
+import struct
+import zipfile
+from typing import Dict, List, Optional, Any, Sequence, Iterable, Tuple
+from timelens.utils import (project_mts, project_mts_incremental, extract_projection_model,
+                            apply_projection_model, time_chunks)
+from timelens.spatial import ProjectionIndex
+from timelens.tiles import ProjectionTiles
+from timelens.similarity import SimilarityIndex
+from timelens.features import extract_features, feature_column_names
+from timelens.outliers import compute_outlier_scores
+from timelens.quantization import (QuantizedArray, plan_quantization, quantize, quantize_block,
+                                   compact_values)
+
+# Client-supplied label sets (e.g. cluster labels) whose tile pyramids are kept
+MAX_TILE_LABEL_SETS = 8
+
+# Outlier scores stored as series variables; depths are relative to the whole collection
+OUTLIER_VARIABLES = ('mbd', 'magnitude_outlyingness', 'variation_outlyingness', 'functional_outlyingness')
+
+
+def _memmap_npz_member(file_path: str, member: str, mmap_mode: str = 'r') -> Optional[np.memmap]:
+    """
+    Memory-maps one array stored inside an uncompressed .npz archive.
+
+    `np.load` ignores `mmap_mode` for .npz files, but members written by
+    `np.savez` are stored without compression, so the raw .npy payload can be
+    mapped directly from its offset inside the zip file.
+
+    Returns:
+        A read-only np.memmap, or None if the member is compressed or holds objects.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        info = archive.getinfo(f"{member}.npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    with open(file_path, 'rb') as f:
+        # Skip the local file header (30 fixed bytes + file name + extra field)
+        f.seek(info.header_offset)
+        local_header = f.read(30)
+        name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+
+    if dtype.hasobject:
+        return None
+    return np.memmap(file_path, dtype=dtype, mode=mmap_mode, shape=shape,
+                     order='F' if fortran_order else 'C', offset=offset)
+
+
+def _write_npz(file_path: str,
+               arrays: Dict[str, Any],
+               streamed: Optional[Dict[str, Tuple[Tuple[int, ...], np.dtype, Iterable[bytes]]]] = None):
+    """
+    Writes an uncompressed .npz archive that `np.load` (and `_memmap_npz_member`)
+    can read, without materializing the streamed members in memory.
+
+    Args:
+        file_path (str): Destination path.
+        arrays (Dict[str, Any]): Members written in full with `np.lib.format.write_array`.
+        streamed: Members given as (shape, dtype, iterable of raw C-order bytes).
+    """
+    with zipfile.ZipFile(file_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for key, value in arrays.items():
+            with archive.open(f"{key}.npy", 'w', force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(value), allow_pickle=True)
+        for key, (shape, dtype, chunks) in (streamed or {}).items():
+            with archive.open(f"{key}.npy", 'w', force_zip64=True) as f:
+                header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                          'fortran_order': False,
+                          'shape': tuple(shape)}
+                np.lib.format.write_array_header_2_0(f, header)
+                for chunk in chunks:
+                    f.write(chunk)
 
 
 class TSPod:
@@ -12,24 +91,33 @@ class TSPod:
 
     Attributes:
         name (str): The name for the dataset.
-        data (np.ndarray): The core MTS data with shape (N, T, D).
+        data (np.ndarray): The core MTS data with shape (N, T, D). Pods stored
+            with an integer precision hold a `QuantizedArray` that dequantizes on read.
         dimension_names (List[str]): A list of names for the D dimensions.
         projection (np.ndarray): A 2D projection array of shape (N, 2).
+        projection_model (Optional[Dict[str, np.ndarray]]): The linear model ('mean',
+            'components') that produced the projection, used to place appended series.
         series_variables (Dict[str, Dict[str, Any]]): A dictionary to hold variables
             describing each of the N series.
+        version (int): Incremented every time series are appended to the stored pod.
+        source_stat (Optional[Tuple[int, int, int]]): (inode, size, mtime_ns) of the
+            file the pod was loaded from; changes whenever the stored pod is rewritten.
+        error_bound (Optional[np.ndarray]): Per-dimension bound of the absolute error
+            introduced by reduced-precision storage, if known.
     """
     def __init__(self,
                  name: str,
                  data: np.ndarray,
                  dimension_names: List[str],
-                 projection: Optional[np.ndarray] = None):
+                 projection: Optional[np.ndarray] = None,
+                 projection_model: Optional[Dict[str, np.ndarray]] = None):
         """
         Initializes the TSPod.
         """
         # --- Validate Inputs ---
         if not name or not isinstance(name, str):
             raise ValueError("`name` must be a non-empty string.")
-        if not isinstance(data, np.ndarray) or data.ndim != 3:
+        if not isinstance(data, (np.ndarray, QuantizedArray)) or data.ndim != 3:
             raise ValueError("`data` must be a 3D NumPy array of shape (N, T, D).")
 
         n_series, _, n_dims = data.shape
@@ -42,15 +130,61 @@ class TSPod:
         self.data = data
         self.dimension_names = dimension_names
         self.series_variables: Dict[str, Dict[str, Any]] = {}
+        self._spatial_index: Optional[ProjectionIndex] = None
+        self._tiles: Optional[ProjectionTiles] = None
+        self._tile_label_keys: List[str] = []
+        self._similarity_index: Optional[SimilarityIndex] = None
+        self.version = 0
+        self.features: Optional[np.ndarray] = None
+        self.feature_names: List[str] = []
+        self.error_bound: Optional[np.ndarray] = getattr(data, 'error_bound', None)
+        self.source_stat: Optional[Tuple[int, int, int]] = None
 
         # --- Handle Projection ---
         if projection is None:
             print("ℹ️ No projection provided. Computing a 2D projection using PCA...")
-            self.projection = project_mts(self.data)
+            self.projection, reducer = project_mts(self.data, return_reducer=True)
+            self.projection_model = extract_projection_model(reducer)
         else:
             if projection.shape[0] != n_series:
                  raise ValueError(f"Provided projection must have {n_series} rows, but got {projection.shape[0]}.")
             self.projection = projection
+            self.projection_model = projection_model
+
+    @property
+    def spatial_index(self) -> ProjectionIndex:
+        """
+        Spatial index over the projection, built on first use and rebuilt if
+        the projection array is replaced.
+        """
+        if self._spatial_index is None or self._spatial_index.points is not self.projection:
+            self._spatial_index = ProjectionIndex(self.projection)
+        return self._spatial_index
+
+    @property
+    def tiles(self) -> ProjectionTiles:
+        """
+        Density tile pyramid over the projection, built on first use and rebuilt
+        if the projection array is replaced.
+        """
+        if self._tiles is None or self._tiles.points is not self.projection:
+            self._tiles = ProjectionTiles(self.projection)
+        return self._tiles
+
+    @property
+    def similarity_index(self) -> SimilarityIndex:
+        """
+        PAA similarity index over the series. Built when the pod is saved (and
+        restored on load); built here on first use if missing.
+        """
+        if self._similarity_index is None:
+            self._similarity_index = SimilarityIndex.build(self.data)
+        return self._similarity_index
+
+    @property
+    def precision(self) -> str:
+        """Storage precision of the series data (see `timelens.quantization.PRECISIONS`)."""
+        return self.data.precision if isinstance(self.data, QuantizedArray) else self.data.dtype.name
 
     @property
     def shape(self):
@@ -94,45 +228,344 @@ class TSPod:
         }
         print(f"✅ Added categorical variable: '{var_name}'")
 
-    def save(self, file_path: str):
+    def compute_features(self, n_jobs: Optional[int] = None, max_chunk_bytes: int = 64 * 1024 ** 2) -> np.ndarray:
         """
-        Saves the entire pod to a compressed .npz file.
+        Computes the per-series feature matrix (see `timelens.features`) and
+        exposes every column as a numerical series variable.
+
+        The matrix is stored once with the pod; its variables are views of its
+        columns and are kept up to date when series are appended.
+
+        Args:
+            n_jobs (Optional[int]): Worker count for the extraction (default: CPU count).
+            max_chunk_bytes (int): Working memory per extraction chunk.
+
+        Returns:
+            The (N, F) feature matrix.
+        """
+        self.features = extract_features(self.data, n_jobs=n_jobs, max_chunk_bytes=max_chunk_bytes)
+        self.feature_names = feature_column_names(self.dimension_names)
+        self._attach_feature_variables()
+        print(f"✅ Added {len(self.feature_names)} feature variables")
+        return self.features
+
+    def _attach_feature_variables(self):
+        """Replaces the feature variables with views of the current feature matrix."""
+        self.series_variables = {
+            name: var_meta for name, var_meta in self.series_variables.items()
+            if var_meta.get('source') != 'features'
+        }
+        if self.features is None:
+            return
+        for i, name in enumerate(self.feature_names):
+            self.series_variables[name] = {
+                'type': 'numerical',
+                'values': self.features[:, i],
+                'source': 'features'
+            }
+
+    def compute_outlier_scores(self,
+                               n_jobs: Optional[int] = None,
+                               max_chunk_bytes: int = 64 * 1024 ** 2) -> Dict[str, np.ndarray]:
+        """
+        Scores every series with the modified band depth and directional
+        outlyingness (see `timelens.outliers`) and stores the scores in
+        `OUTLIER_VARIABLES` as numerical series variables.
+
+        Args:
+            n_jobs (Optional[int]): Number of dimensions scored concurrently.
+            max_chunk_bytes (int): Working memory per dimension.
+
+        Returns:
+            All scores, including the per-dimension ones.
+        """
+        scores = compute_outlier_scores(self.data, n_jobs=n_jobs, max_chunk_bytes=max_chunk_bytes)
+        for name in OUTLIER_VARIABLES:
+            self.series_variables[name] = {
+                'type': 'numerical',
+                'values': scores[name],
+                'source': 'outliers'
+            }
+        print(f"✅ Added outlier scores: {', '.join(OUTLIER_VARIABLES)}")
+        return scores
+
+    def save(self, file_path: str, compressed: bool = True, precision: Optional[str] = None):
+        """
+        Saves the entire pod to a .npz file.
+
+        The pod is written to a temporary file that atomically replaces
+        `file_path`, so a pod memory-mapped from that path (including by a
+        watching server) keeps reading the old file instead of a truncated one.
+
+        Args:
+            file_path (str): Destination path; '.npz' is appended if missing.
+            compressed (bool): If False, arrays are stored uncompressed so the
+                               pod can later be loaded with `mmap_mode`.
+            precision (Optional[str]): Store the series as 'float32', 'float16',
+                               'uint16' or 'uint8' (per-dimension scale/offset)
+                               instead of the current precision. The projection
+                               is then stored as float32. The resulting
+                               per-dimension error bound, including any error
+                               of the current storage, is stored with the pod.
         """
         if not file_path.endswith('.npz'):
             file_path += '.npz'
 
+        if precision is None:
+            stored = self.data.raw if isinstance(self.data, QuantizedArray) else self.data
+            payload = {'data': stored, **self._metadata_payload()}
+        else:
+            stored, plan = quantize(self.data, precision)
+            if self.error_bound is not None:
+                # The plan measures error against already-rounded values; add the earlier error
+                plan['error_bound'] = self.error_bound + plan['error_bound']
+            payload = {'data': stored, **self._metadata_payload(plan)}
+            if precision != 'float64':
+                payload['projection'] = self.projection.astype(np.float32)
+            print(f"ℹ️ Stored as {precision}; max error per dimension: {np.round(plan['error_bound'], 6).tolist()}")
+
+        temp_path = file_path + '.tmp'
+        try:
+            # A file object keeps np.savez from appending another '.npz'
+            with open(temp_path, 'wb') as f:
+                if compressed:
+                    np.savez_compressed(f, **payload)
+                else:
+                    np.savez(f, **payload)
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        print(f"💾 Pod saved successfully to '{file_path}'")
+
+    def _metadata_payload(self, plan: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Every stored array except the series data itself. `plan` (see
+        `plan_quantization`) describes the stored data when it differs from the
+        pod's current storage.
+        """
         payload = {
             'name': np.array(self.name),
-            'data': self.data,
             'dimension_names': np.array(self.dimension_names, dtype=object),
             'projection': self.projection,
-            'series_variables': np.array(self.series_variables)
+            # Feature variables are stored once, as the feature matrix below
+            'series_variables': np.array({
+                name: var_meta for name, var_meta in self.series_variables.items()
+                if var_meta.get('source') != 'features'
+            }),
+            'version': np.array(self.version)
         }
 
-        np.savez_compressed(file_path, **payload)
-        print(f"💾 Pod saved successfully to '{file_path}'")
+        if plan is None and isinstance(self.data, QuantizedArray):
+            plan = {'precision': self.precision, 'scale': self.data.scale, 'offset': self.data.offset,
+                    'error_bound': self.error_bound}
+        if plan is not None:
+            payload['data_precision'] = np.array(plan['precision'])
+            payload['data_error_bound'] = plan['error_bound']
+            if plan['scale'] is not None:
+                payload['data_scale'] = plan['scale']
+                payload['data_offset'] = plan['offset']
+        elif self.error_bound is not None:
+            payload['data_precision'] = np.array(self.precision)
+            payload['data_error_bound'] = self.error_bound
+
+        if self.features is not None:
+            payload['features'] = self.features
+            payload['feature_names'] = np.array(self.feature_names, dtype=object)
+
+        if self.projection_model is not None:
+            payload['projection_mean'] = self.projection_model['mean']
+            payload['projection_components'] = self.projection_model['components']
+
+        # Persist the similarity index so queries never need a full scan after loading
+        index = self.similarity_index
+        payload['similarity_paa'] = index.paa
+        payload['similarity_mean'] = index.mean
+        payload['similarity_std'] = index.std
+        return payload
 
     @classmethod
-    def load(cls, file_path: str) -> 'TSPod':
+    def load(cls, file_path: str, mmap_mode: Optional[str] = None) -> 'TSPod':
         """
         Loads a pod from a .npz file.
+
+        Args:
+            file_path (str): Path to the .npz file.
+            mmap_mode (Optional[str]): If 'r' (or 'c'), the series data is memory-mapped
+                                       instead of read into RAM. Requires a pod saved
+                                       with `compressed=False`.
         """
+        st = os.stat(file_path)
+        data = None
+        if mmap_mode is not None:
+            data = _memmap_npz_member(file_path, 'data', mmap_mode)
+            if data is None:
+                print("ℹ️ Pod data is compressed and cannot be memory-mapped; loading it into memory.")
+
         with np.load(file_path, allow_pickle=True) as loaded_data:
             # .item() extracts the value from a 0-d object array
             name = loaded_data['name'].item()
-            data = loaded_data['data']
+            if data is None:
+                data = loaded_data['data']
             dimension_names = list(loaded_data['dimension_names'])
             projection = loaded_data['projection']
+            error_bound = loaded_data['data_error_bound'] if 'data_error_bound' in loaded_data else None
+            if 'data_scale' in loaded_data:
+                data = QuantizedArray(data, loaded_data['data_scale'], loaded_data['data_offset'], error_bound)
+            model = None
+            if 'projection_components' in loaded_data:
+                model = {'mean': loaded_data['projection_mean'],
+                         'components': loaded_data['projection_components']}
 
             # Instantiate the class
-            instance = cls(name, data, dimension_names, projection=projection)
+            instance = cls(name, data, dimension_names, projection=projection, projection_model=model)
+            if 'version' in loaded_data:
+                instance.version = int(loaded_data['version'])
+            instance.error_bound = error_bound
+            instance.source_stat = (st.st_ino, st.st_size, st.st_mtime_ns)
 
             # Load series variables if they exist
             if 'series_variables' in loaded_data:
                 instance.series_variables = loaded_data['series_variables'].item()
 
+            if 'features' in loaded_data:
+                instance.features = loaded_data['features']
+                instance.feature_names = list(loaded_data['feature_names'])
+                instance._attach_feature_variables()
+
+            if 'similarity_paa' in loaded_data:
+                instance._similarity_index = SimilarityIndex(
+                    loaded_data['similarity_paa'],
+                    loaded_data['similarity_mean'],
+                    loaded_data['similarity_std'],
+                    n_timesteps=instance.shape[1]
+                )
+
         print(f"📂 Pod loaded successfully from '{file_path}'")
         return instance
+
+    @classmethod
+    def append_to_file(cls,
+                       file_path: str,
+                       data: np.ndarray,
+                       numerical_variables: Optional[Dict[str, np.ndarray]] = None,
+                       categorical_variables: Optional[Dict[str, np.ndarray]] = None,
+                       categorical_labels: Optional[Dict[str, Dict[int, str]]] = None,
+                       mmap_mode: Optional[str] = 'r',
+                       max_chunk_bytes: int = 256 * 1024 ** 2) -> 'TSPod':
+        """
+        Appends new series to a stored pod without refitting its projection.
+
+        New series are placed with the stored projection model (the PCA's
+        `transform`) and added to the similarity index; existing series keep
+        their coordinates. New series are stored at the pod's precision; for
+        integer-quantized pods they must lie within the stored range. Stored features are extracted for the new series,
+        so feature variables need no values. Outlier scores are relative to the
+        whole collection, so they are dropped and must be recomputed. The existing data is streamed into a temporary file
+        that atomically replaces the pod, so readers (e.g. a watching server)
+        never see a partial file. The result is stored uncompressed.
+
+        Args:
+            file_path (str): Path to the stored pod.
+            data (np.ndarray): New series of shape (B, T, D).
+            numerical_variables (Optional[Dict[str, np.ndarray]]): (B,) values for
+                every numerical variable of the pod.
+            categorical_variables (Optional[Dict[str, np.ndarray]]): (B,) integer codes
+                for every categorical variable of the pod.
+            categorical_labels (Optional[Dict[str, Dict[int, str]]]): Labels for new codes.
+            mmap_mode (Optional[str]): How to load the returned pod.
+
+        Returns:
+            The updated pod, loaded from `file_path`.
+        """
+        pod = cls.load(file_path, mmap_mode='r')
+        n_series, n_timesteps, n_dims = pod.shape
+        data = np.asarray(data)
+        if data.ndim != 3 or data.shape[1:] != (n_timesteps, n_dims):
+            raise ValueError(f"`data` must be a 3D array of shape (B, {n_timesteps}, {n_dims}).")
+        n_new = data.shape[0]
+
+        # --- Storage: new series use the pod's precision (and quantization range) ---
+        if isinstance(pod.data, QuantizedArray):
+            stored = pod.data.raw
+            new_stored = quantize_block(data, {'scale': pod.data.scale, 'offset': pod.data.offset,
+                                               'dtype': stored.dtype})
+        else:
+            stored = pod.data
+            new_stored = np.ascontiguousarray(data, dtype=stored.dtype)
+            if pod.error_bound is not None:
+                new_error = plan_quantization(data, pod.precision)['error_bound']
+                pod.error_bound = np.maximum(pod.error_bound, new_error)
+
+        # --- Variables: every existing variable needs values for the new series ---
+        provided = {**(numerical_variables or {}), **(categorical_variables or {})}
+        stored_variables = {
+            name: var_meta for name, var_meta in pod.series_variables.items()
+            if var_meta.get('source') not in ('features', 'outliers')
+        }
+        if any(var_meta.get('source') == 'outliers' for var_meta in pod.series_variables.values()):
+            print("ℹ️ Outlier scores are dropped on append; recompute them with `compute_outlier_scores`.")
+        if set(provided) != set(stored_variables):
+            raise ValueError(f"Values must be provided for exactly the variables {sorted(stored_variables)}.")
+        series_variables = {}
+        for var_name, var_meta in stored_variables.items():
+            values = np.asarray(provided[var_name])
+            if values.shape != (n_new,):
+                raise ValueError(f"Values of '{var_name}' must have shape ({n_new},).")
+            updated = {**var_meta, 'values': np.concatenate([var_meta['values'], values])}
+            if var_meta['type'] == 'categorical':
+                if not np.issubdtype(values.dtype, np.integer):
+                    raise TypeError("Categorical values must be an array of integers.")
+                labels = dict(var_meta['labels'])
+                for code in np.unique(values):
+                    labels.setdefault(int(code), str(code))
+                labels.update((categorical_labels or {}).get(var_name, {}))
+                updated['labels'] = labels
+            series_variables[var_name] = updated
+
+        # --- Projection: reuse the stored model, fitting one only for legacy pods ---
+        if pod.projection_model is None:
+            print("ℹ️ Pod has no stored projection model. Fitting one with incremental PCA...")
+            pod.projection, reducer = project_mts_incremental(pod.data, max_chunk_bytes, return_reducer=True)
+            pod.projection_model = extract_projection_model(reducer)
+        new_projection = apply_projection_model(data, pod.projection_model)
+
+        index = pod.similarity_index
+        new_index = SimilarityIndex.build(data, n_segments=index.paa.shape[1])
+
+        pod.projection = np.concatenate([pod.projection, new_projection])
+        pod.series_variables = series_variables
+        if pod.features is not None:
+            pod.features = np.concatenate([pod.features, extract_features(data)])
+            pod._attach_feature_variables()
+        pod._similarity_index = SimilarityIndex(
+            np.concatenate([index.paa, new_index.paa]),
+            np.concatenate([index.mean, new_index.mean]),
+            np.concatenate([index.std, new_index.std]),
+            n_timesteps=n_timesteps
+        )
+        pod.version += 1
+
+        # --- Stream old + new series into a temporary file, then swap it in ---
+        dtype = stored.dtype
+        rows_per_chunk = int(max(1, max_chunk_bytes // max(1, n_timesteps * n_dims * dtype.itemsize)))
+
+        def data_chunks():
+            for start in range(0, n_series, rows_per_chunk):
+                yield np.ascontiguousarray(stored[start:start + rows_per_chunk]).tobytes()
+            yield np.ascontiguousarray(new_stored).tobytes()
+
+        temp_path = file_path + '.tmp'
+        shape = (n_series + n_new, n_timesteps, n_dims)
+        try:
+            _write_npz(temp_path, pod._metadata_payload(), streamed={'data': (shape, dtype, data_chunks())})
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        print(f"➕ Appended {n_new} series to '{file_path}' (version {pod.version})")
+
+        return cls.load(file_path, mmap_mode=mmap_mode)
     
     def get_info(self) -> Dict[str, Any]:
         """
@@ -151,14 +584,22 @@ class TSPod:
         
         return {
             "name": self.name,
+            "version": self.version,
             "n_series": n_series,
             "n_timesteps": n_timesteps,
             "n_dims": n_dims,
             "categorical_variables": categorical_vars,
-            "numerical_variables": numerical_vars
+            "numerical_variables": numerical_vars,
+            "feature_variables": list(self.feature_names),
+            "precision": self.precision,
+            "error_bound": self.error_bound.tolist() if self.error_bound is not None else None
         }
 
-    def get_data_payload(self, max_series: Optional[int] = None) -> Dict[str, Any]:
+    def get_data_payload(self,
+                         max_series: Optional[int] = None,
+                         indices: Optional[Sequence[int]] = None,
+                         seed: Optional[int] = None,
+                         compact: bool = False) -> Dict[str, Any]:
         """
         Prepares the pod's data for server transmission with a clear and organized
         structure, allowing for optional sampling.
@@ -166,21 +607,57 @@ class TSPod:
         Args:
             max_series (Optional[int]): The maximum number of series to return.
                                         If None, all series are returned.
+            indices (Optional[Sequence[int]]): Restrict the payload to these series
+                                               (e.g. a spatial selection). Sampling
+                                               with `max_series` applies within them.
+            seed (Optional[int]): Seed for the `max_series` sample, making it
+                                  reproducible (and cacheable). Random if None.
+            compact (bool): Send the series in their stored precision instead of
+                            as float64. Integer-quantized pods send the stored
+                            integers; float pods send values rounded within their
+                            error bound, or float32/float16 pods without one
+                            their shortest repr at that precision. Float64 pods
+                            without an error bound gain nothing. 'data_encoding'
+                            describes how to decode them.
 
         Returns:
-            A dictionary formatted for use as a JSON API response.
+            A dictionary formatted for use as a JSON API response. When a subset
+            of the series is returned, 'indices' lists the series it contains.
         """
         n_series, _, _ = self.shape
         
-        # Determine which series indices to use (all or a random sample)
-        indices = np.arange(n_series)
-        if max_series is not None and max_series < n_series:
-            print(f"ℹ️ Sampling {max_series} out of {n_series} series.")
-            indices = np.random.choice(indices, max_series, replace=False)
+        # Determine which series indices to use (all, a selection, or a random sample)
+        subset = indices is not None
+        if subset:
+            indices = np.asarray(indices, dtype=np.intp)
+            if indices.size and (indices.min() < 0 or indices.max() >= n_series):
+                raise ValueError(f"Indices must be in the range [0, {n_series}).")
+        else:
+            indices = np.arange(n_series)
+        if max_series is not None and max_series < len(indices):
+            print(f"ℹ️ Sampling {max_series} out of {len(indices)} series.")
+            rng = np.random.default_rng(seed) if seed is not None else np.random
+            indices = np.sort(rng.choice(indices, max_series, replace=False))
+            subset = True
 
         # Apply sampling indices to the core data
-        sampled_data = self.data[indices]
         sampled_projection = self.projection[indices]
+        data_encoding = None
+        if compact and isinstance(self.data, QuantizedArray):
+            # Clients decode with value = q * scale[d] + offset[d]
+            sampled_data = self.data.raw[indices]
+            data_encoding = {"type": "scaled_integer", "precision": self.precision,
+                             "scale": self.data.scale.tolist(), "offset": self.data.offset.tolist(),
+                             "error_bound": self.error_bound.tolist()}
+        elif compact:
+            sampled_data, bound = compact_values(self.data[indices], self.error_bound, self.data.dtype)
+            data_encoding = {"type": "float", "precision": self.precision,
+                             "error_bound": bound.tolist() if bound is not None else None}
+            # Float32 resolution is plenty for screen coordinates
+            extent = np.abs(sampled_projection).max(axis=0) if len(indices) else np.zeros(2)
+            sampled_projection, _ = compact_values(sampled_projection, np.finfo(np.float32).eps * extent)
+        else:
+            sampled_data = self.data[indices]
         
         # --- NEW: Process variables into separate, self-contained dictionaries ---
         numerical_payload = {}
@@ -209,4 +686,379 @@ class TSPod:
             "numerical_variables": numerical_payload,
             "categorical_variables": categorical_payload
         }
+        if data_encoding is not None:
+            payload["data_encoding"] = data_encoding
+        if subset:
+            payload["indices"] = indices.tolist()
+        return payload
+
+
+    def get_selection_summary(self,
+                              indices: Sequence[int],
+                              quantiles: Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95),
+                              include_complement: bool = True,
+                              max_chunk_bytes: int = 64 * 1024 ** 2) -> Dict[str, Any]:
+        """
+        Computes per-timestep, per-dimension summary statistics for a selection
+        of series (and optionally for the remaining series).
+
+        Rows are gathered one block of timesteps at a time, so a memory-mapped
+        pod only reads the requested series and memory stays bounded by
+        `max_chunk_bytes` regardless of N.
+
+        Args:
+            indices (Sequence[int]): Indices of the selected series.
+            quantiles (Sequence[float]): Quantile levels in [0, 1] for the bands.
+            include_complement (bool): Also summarize the non-selected series.
+            max_chunk_bytes (int): Working memory budget per block of timesteps.
+
+        Returns:
+            A dictionary formatted for use as a JSON API response. Each (T, D)
+            array is flattened in row-major order, like `get_data_payload`.
+        """
+        n_series, n_timesteps, n_dims = self.shape
+
+        selected = np.unique(np.asarray(indices, dtype=np.intp))
+        if selected.size and (selected[0] < 0 or selected[-1] >= n_series):
+            raise ValueError(f"Indices must be in the range [0, {n_series}).")
+        quantiles = [float(q) for q in quantiles]
+        if any(q < 0 or q > 1 for q in quantiles):
+            raise ValueError("Quantiles must be in the range [0, 1].")
+
+        groups = {"selected": selected}
+        if include_complement:
+            mask = np.ones(n_series, dtype=bool)
+            mask[selected] = False
+            groups["complement"] = np.flatnonzero(mask)
+
+        payload = {
+            "shape": (n_timesteps, n_dims),
+            "dimensions": self.dimension_names,
+            "quantiles": quantiles,
+        }
+        for group_name, rows in groups.items():
+            payload[group_name] = self._summarize_rows(rows, quantiles, max_chunk_bytes)
+        return payload
+
+    def _summarize_rows(self, rows: np.ndarray, quantiles: List[float], max_chunk_bytes: int) -> Dict[str, Any]:
+        """Mean, std and quantile bands over the given rows, chunked along T."""
+        _, n_timesteps, n_dims = self.shape
+        if rows.size == 0:
+            return {"n": 0, "mean": None, "std": None, "quantiles": None}
+
+        mean = np.empty((n_timesteps, n_dims))
+        std = np.empty((n_timesteps, n_dims))
+        bands = np.empty((len(quantiles), n_timesteps, n_dims))
+        ddof = 1 if rows.size > 1 else 0
+
+        # A full, contiguous selection can use a plain slice instead of fancy indexing
+        row_index = slice(None) if rows.size == self.shape[0] else rows
+        for chunk in time_chunks(rows.size, n_timesteps, n_dims, max_chunk_bytes):
+            block = np.asarray(self.data[row_index, chunk], dtype=np.float64)
+            mean[chunk] = block.mean(axis=0)
+            std[chunk] = block.std(axis=0, ddof=ddof)
+            if quantiles:
+                bands[:, chunk] = np.quantile(block, quantiles, axis=0)
+
+        return {
+            "n": int(rows.size),
+            "mean": mean.ravel().tolist(),
+            "std": std.ravel().tolist(),
+            "quantiles": {str(q): bands[i].ravel().tolist() for i, q in enumerate(quantiles)}
+        }
+
+    def get_density_tile(self,
+                         zoom: int,
+                         x: int,
+                         y: int,
+                         variable: Optional[str] = None,
+                         point_threshold: int = 1000,
+                         labels: Optional[Sequence[int]] = None,
+                         labels_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Prepares one density tile of the projection for server transmission.
+
+        Besides stored categorical variables, the counts can be split by labels
+        the pod does not store, such as the cluster labels from /clustering:
+        send the N labels once with a `labels_key`, then request further tiles
+        with the key alone. The last `MAX_TILE_LABEL_SETS` label sets are kept.
+
+        Args:
+            zoom (int): Zoom level; zoom 0 is a single tile covering all points.
+            x (int): Tile column.
+            y (int): Tile row.
+            variable (Optional[str]): Categorical variable to split the counts by.
+            point_threshold (int): If the tile holds at most this many points, their
+                                   indices and coordinates are included so the
+                                   client can draw them individually.
+            labels (Optional[Sequence[int]]): (N,) integer labels to split the counts
+                                   by; replaces any labels cached under `labels_key`.
+            labels_key (Optional[str]): Name of the label set, required with
+                                   `labels` and enough on its own once cached.
+
+        Returns:
+            A dictionary formatted for use as a JSON API response.
+        """
+        categories = None
+        cache_key = variable
+        if labels_key is not None:
+            if variable is not None:
+                raise ValueError("Pass either `variable` or `labels_key`, not both.")
+            tiles = self.tiles
+            cache_key = ('labels', labels_key)
+            if labels is not None:
+                categories = np.asarray(labels)
+                if categories.shape != (self.shape[0],) or not np.issubdtype(categories.dtype, np.integer):
+                    raise ValueError(f"`labels` must be {self.shape[0]} integers, one per series.")
+                tiles.discard(cache_key)
+                if labels_key in self._tile_label_keys:
+                    self._tile_label_keys.remove(labels_key)
+                self._tile_label_keys.append(labels_key)
+                while len(self._tile_label_keys) > MAX_TILE_LABEL_SETS:
+                    tiles.discard(('labels', self._tile_label_keys.pop(0)))
+            elif not tiles.has_pyramid(cache_key):
+                raise ValueError(f"No labels are cached under '{labels_key}'; send `labels` with it.")
+        elif labels is not None:
+            raise ValueError("`labels_key` is required with `labels`.")
+        elif variable is not None:
+            var_meta = self.series_variables.get(variable)
+            if var_meta is None or var_meta['type'] != 'categorical':
+                raise ValueError(f"'{variable}' is not a categorical variable of this pod.")
+            categories = var_meta['values']
+
+        payload = self.tiles.tile(zoom, x, y, categories=categories, cache_key=cache_key)
+        payload["variable"] = variable
+        if labels_key is not None:
+            payload["labels_key"] = labels_key
+
+        if payload["total"] <= point_threshold:
+            indices = self.spatial_index.query_rectangle(*payload["bounds"])
+            payload["points"] = {
+                "indices": indices.tolist(),
+                "projection": self.projection[indices].flatten().tolist()
+            }
         return payload
+
+    def find_similar(self,
+                     query: Optional[np.ndarray] = None,
+                     index: Optional[int] = None,
+                     k: int = 10,
+                     metric: str = 'euclidean',
+                     window: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Finds the k series most similar to a query series.
+
+        Args:
+            query (Optional[np.ndarray]): A (T, D) series, or (T,) for univariate pods.
+            index (Optional[int]): Use series `index` of this pod as the query instead;
+                                   the series itself is excluded from the results.
+            k (int): Number of neighbours to return.
+            metric (str): 'euclidean' or 'dtw', both on z-normalized series.
+            window (Optional[int]): Sakoe-Chiba band half-width for DTW.
+
+        Returns:
+            A dictionary with the neighbour indices and distances, closest first.
+        """
+        n_series, n_timesteps, n_dims = self.shape
+        if index is not None:
+            if not 0 <= index < n_series:
+                raise ValueError(f"Index must be in the range [0, {n_series}).")
+            query = self.data[index]
+        elif query is None:
+            raise ValueError("Either `query` or `index` must be provided.")
+        query = np.asarray(query, dtype=np.float64)
+        if query.ndim == 1 and n_dims == 1:
+            query = query[:, None]
+
+        return self.similarity_index.search(self.data, query, k=k, metric=metric,
+                                            window=window, exclude=index)
+
+
+class TSPodBuilder:
+    """
+    Builds a TSPod file from series that arrive in batches, for inputs larger
+    than memory (generators, CSV chunks, many files).
+
+    Each batch is appended to a raw scratch file next to the destination, so
+    only one batch is held in memory at a time. `finalize` computes the
+    projection incrementally over the scratch file, streams everything into an
+    uncompressed pod, and returns it loaded with memory-mapped data. With a
+    reduced float `dtype` (e.g. np.float32) the largest rounding error per
+    dimension is recorded as the pod's error bound.
+
+    Example:
+        with TSPodBuilder("Sensors", "sensors.npz", dimension_names=dims) as builder:
+            for chunk in pd.read_csv("export.csv", chunksize=10_000):
+                builder.add_batch(to_series(chunk), numerical_variables={"temp": chunk["temp"].to_numpy()})
+            pod = builder.finalize()
+    """
+    def __init__(self,
+                 name: str,
+                 file_path: str,
+                 dimension_names: List[str],
+                 dtype: Any = np.float64,
+                 max_chunk_bytes: int = 256 * 1024 ** 2):
+        if not name or not isinstance(name, str):
+            raise ValueError("`name` must be a non-empty string.")
+        if not isinstance(dimension_names, list) or not dimension_names:
+            raise ValueError("`dimension_names` must be a non-empty list of strings.")
+        if not file_path.endswith('.npz'):
+            file_path += '.npz'
+
+        self.name = name
+        self.file_path = file_path
+        self.dimension_names = dimension_names
+        self.dtype = np.dtype(dtype)
+        self.max_chunk_bytes = max_chunk_bytes
+        self.n_series = 0
+        self.n_timesteps: Optional[int] = None
+
+        self._scratch_path = file_path + '.partial'
+        self._scratch = open(self._scratch_path, 'wb')
+        self._variables: Dict[str, Dict[str, Any]] = {}
+        self._labels: Dict[str, Dict[int, str]] = {}
+        # Largest rounding error of storing the batches at `dtype`, per dimension
+        self._error_bound = np.zeros(len(dimension_names))
+
+    def __enter__(self) -> 'TSPodBuilder':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Discards the scratch file (called automatically after `finalize`)."""
+        if not self._scratch.closed:
+            self._scratch.close()
+        if os.path.exists(self._scratch_path):
+            os.remove(self._scratch_path)
+
+    def set_categorical_labels(self, var_name: str, labels: Dict[int, str]):
+        """
+        Sets the labels of a categorical variable. Codes seen in the batches
+        without a label get their string representation.
+        """
+        self._labels[var_name] = dict(labels)
+
+    def add_batch(self,
+                  data: np.ndarray,
+                  numerical_variables: Optional[Dict[str, np.ndarray]] = None,
+                  categorical_variables: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Appends a batch of series (and their variables) to the pod.
+
+        Args:
+            data (np.ndarray): Series of shape (B, T, D); T and D must match earlier batches.
+            numerical_variables (Optional[Dict[str, np.ndarray]]): (B,) values per variable.
+            categorical_variables (Optional[Dict[str, np.ndarray]]): (B,) integer codes per variable.
+
+        Every batch must provide the same variables.
+        """
+        data = np.asarray(data)
+        if data.ndim != 3 or data.shape[2] != len(self.dimension_names):
+            raise ValueError(f"`data` must be a 3D array of shape (B, T, {len(self.dimension_names)}).")
+        if self.n_timesteps is None:
+            self.n_timesteps = data.shape[1]
+        elif data.shape[1] != self.n_timesteps:
+            raise ValueError(f"All batches must have {self.n_timesteps} timesteps, but got {data.shape[1]}.")
+
+        batch_variables = {}
+        for var_type, variables in (('numerical', numerical_variables), ('categorical', categorical_variables)):
+            for var_name, values in (variables or {}).items():
+                values = np.asarray(values)
+                if values.shape != (data.shape[0],):
+                    raise ValueError(f"Values of '{var_name}' must have shape ({data.shape[0]},).")
+                if var_type == 'categorical' and not np.issubdtype(values.dtype, np.integer):
+                    raise TypeError("Categorical values must be an array of integers.")
+                batch_variables[var_name] = (var_type, values)
+
+        expected = set(self._variables) if self.n_series else set(batch_variables)
+        if set(batch_variables) != expected:
+            raise ValueError(f"Every batch must provide the variables {sorted(expected)}.")
+
+        for var_name, (var_type, values) in batch_variables.items():
+            var_meta = self._variables.setdefault(var_name, {'type': var_type, 'chunks': []})
+            if var_meta['type'] != var_type:
+                raise ValueError(f"Variable '{var_name}' changed type between batches.")
+            var_meta['chunks'].append(values)
+
+        stored = np.ascontiguousarray(data, dtype=self.dtype)
+        if np.issubdtype(data.dtype, np.floating) and data.dtype.itemsize > self.dtype.itemsize:
+            deviation = np.where(np.isfinite(data), np.abs(stored.astype(np.float64) - data), 0.0)
+            if deviation.size:
+                self._error_bound = np.maximum(self._error_bound, deviation.reshape(-1, data.shape[2]).max(axis=0))
+        self._scratch.write(stored.tobytes())
+        self.n_series += data.shape[0]
+
+    def add_batches(self, batches: Iterable[Any]):
+        """
+        Appends every batch from an iterable (e.g. a generator). Items are either
+        arrays of series or (data, numerical_variables, categorical_variables) tuples.
+        """
+        for batch in batches:
+            if isinstance(batch, tuple):
+                self.add_batch(*batch)
+            else:
+                self.add_batch(batch)
+
+    def _scratch_chunks(self) -> Iterable[bytes]:
+        with open(self._scratch_path, 'rb') as f:
+            while True:
+                chunk = f.read(self.max_chunk_bytes)
+                if not chunk:
+                    break
+                yield chunk
+
+    def finalize(self) -> TSPod:
+        """
+        Computes the projection and similarity index, writes the pod file and
+        returns it loaded with memory-mapped data.
+        """
+        if self.n_series < 2:
+            raise ValueError("At least 2 series are required to build a pod.")
+        self._scratch.close()
+
+        shape = (self.n_series, self.n_timesteps, len(self.dimension_names))
+        data = np.memmap(self._scratch_path, dtype=self.dtype, mode='r', shape=shape)
+
+        print("ℹ️ Computing a 2D projection using incremental PCA...")
+        projection, reducer = project_mts_incremental(data, max_bytes=self.max_chunk_bytes, return_reducer=True)
+        model = extract_projection_model(reducer)
+        index = SimilarityIndex.build(data, max_chunk_bytes=self.max_chunk_bytes)
+
+        series_variables = {}
+        for var_name, var_meta in self._variables.items():
+            values = np.concatenate(var_meta['chunks'])
+            series_variables[var_name] = {'type': var_meta['type'], 'values': values}
+            if var_meta['type'] == 'categorical':
+                labels = {int(code): str(code) for code in np.unique(values)}
+                labels.update(self._labels.get(var_name, {}))
+                series_variables[var_name]['labels'] = labels
+        del data
+
+        arrays = {
+            'name': np.array(self.name),
+            'dimension_names': np.array(self.dimension_names, dtype=object),
+            'projection': projection,
+            'series_variables': np.array(series_variables),
+            'version': np.array(0),
+            'projection_mean': model['mean'],
+            'projection_components': model['components'],
+            'similarity_paa': index.paa,
+            'similarity_mean': index.mean,
+            'similarity_std': index.std,
+            'data_precision': np.array(self.dtype.name),
+            'data_error_bound': self._error_bound
+        }
+        # Written beside the destination and renamed, so a server watching it never maps a partial file
+        temp_path = self.file_path + '.tmp'
+        try:
+            _write_npz(temp_path, arrays, streamed={'data': (shape, self.dtype, self._scratch_chunks())})
+            os.replace(temp_path, self.file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.close()
+        print(f"💾 Pod built successfully at '{self.file_path}'")
+
+        return TSPod.load(self.file_path, mmap_mode='r')
\ No newline at end of file
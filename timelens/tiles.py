@@ -0,0 +1,166 @@
+# timelens/tiles.py
+"""
+Multi-zoom density tiles over the 2D projection for rendering large scatterplots.
+"""
+import numpy as np
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class ProjectionTiles:
+    """
+    A sparse density pyramid over an (N, 2) projection.
+
+    Zoom level z splits the projection's bounding box into 2^z x 2^z tiles of
+    `tile_size` x `tile_size` bins. Each level is stored sparsely as sorted
+    (key, count) pairs, where keys are ordered by (category, tile, row, column),
+    so the bins of one tile are a contiguous slice found with `searchsorted`.
+    The finest level is binned from the points once; coarser levels are
+    aggregated from the level below, so a pyramid costs O(N) memory per level
+    regardless of the zoom depth. Pyramids are built on first use and cached
+    per `cache_key` (e.g. a categorical variable name).
+
+    Attributes:
+        points (np.ndarray): The (N, 2) projection the tiles were built over.
+        tile_size (int): Number of bins along each side of a tile.
+        max_zoom (int): Deepest zoom level.
+        bounds (Tuple[float, float, float, float]): (xmin, ymin, xmax, ymax) of zoom 0.
+    """
+    def __init__(self, points: np.ndarray, tile_size: int = 256, max_zoom: int = 8):
+        points = np.asarray(points)
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise ValueError("`points` must be an array of shape (N, 2).")
+        if tile_size < 1 or max_zoom < 0:
+            raise ValueError("`tile_size` must be >= 1 and `max_zoom` >= 0.")
+
+        self.points = points
+        self.tile_size = tile_size
+        self.max_zoom = max_zoom
+
+        lower = points.min(axis=0) if len(points) else np.zeros(2)
+        upper = points.max(axis=0) if len(points) else np.ones(2)
+        span = np.where(upper > lower, upper - lower, 1.0)
+        self.bounds = (float(lower[0]), float(lower[1]), float(lower[0] + span[0]), float(lower[1] + span[1]))
+
+        # Bin coordinates on the finest grid, shared by every pyramid
+        finest = (2 ** max_zoom) * tile_size
+        cells = np.floor((points - lower) / span * finest)
+        self._cells = np.clip(cells, 0, finest - 1).astype(np.int64)
+        self._pyramids: Dict[Hashable, Tuple[List[Tuple[np.ndarray, np.ndarray]], np.ndarray]] = {}
+
+    def _level_size(self, zoom: int) -> int:
+        """Number of bins in one category of a zoom level."""
+        return ((2 ** zoom) * self.tile_size) ** 2
+
+    def _encode(self, codes: np.ndarray, cells: np.ndarray, zoom: int) -> np.ndarray:
+        ts = self.tile_size
+        tx, lx = np.divmod(cells[:, 0], ts)
+        ty, ly = np.divmod(cells[:, 1], ts)
+        tile = ty * (2 ** zoom) + tx
+        return codes * self._level_size(zoom) + (tile * ts + ly) * ts + lx
+
+    def _decode(self, keys: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+        ts = self.tile_size
+        codes, rest = np.divmod(keys, self._level_size(zoom))
+        tile, local = np.divmod(rest, ts * ts)
+        ty, tx = np.divmod(tile, 2 ** zoom)
+        ly, lx = np.divmod(local, ts)
+        return codes, np.stack([tx * ts + lx, ty * ts + ly], axis=1)
+
+    def _pyramid(self, categories: Optional[np.ndarray], cache_key: Hashable):
+        """Builds (or returns the cached) sparse pyramid for one grouping of the points."""
+        if cache_key in self._pyramids:
+            return self._pyramids[cache_key]
+
+        if categories is None:
+            category_values = np.array([0])
+            codes = np.zeros(len(self.points), dtype=np.int64)
+        else:
+            category_values, codes = np.unique(np.asarray(categories), return_inverse=True)
+            codes = codes.astype(np.int64)
+
+        levels = [None] * (self.max_zoom + 1)
+        keys, counts = np.unique(self._encode(codes, self._cells, self.max_zoom), return_counts=True)
+        levels[self.max_zoom] = (keys, counts)
+        for zoom in range(self.max_zoom - 1, -1, -1):
+            level_codes, level_cells = self._decode(keys, zoom + 1)
+            keys, inverse = np.unique(self._encode(level_codes, level_cells >> 1, zoom), return_inverse=True)
+            counts = np.bincount(inverse, weights=counts).astype(np.int64)
+            levels[zoom] = (keys, counts)
+
+        self._pyramids[cache_key] = (levels, category_values)
+        return self._pyramids[cache_key]
+
+    def has_pyramid(self, cache_key: Hashable) -> bool:
+        """Whether a pyramid is cached under `cache_key`."""
+        return cache_key in self._pyramids
+
+    def discard(self, cache_key: Hashable):
+        """Drops the pyramid cached under `cache_key`, if any."""
+        self._pyramids.pop(cache_key, None)
+
+    def tile_bounds(self, zoom: int, x: int, y: int) -> Tuple[float, float, float, float]:
+        """(xmin, ymin, xmax, ymax) of a tile in projection coordinates."""
+        xmin, ymin, xmax, ymax = self.bounds
+        width = (xmax - xmin) / 2 ** zoom
+        height = (ymax - ymin) / 2 ** zoom
+        return (xmin + x * width, ymin + y * height, xmin + (x + 1) * width, ymin + (y + 1) * height)
+
+    def tile(self,
+             zoom: int,
+             x: int,
+             y: int,
+             categories: Optional[np.ndarray] = None,
+             cache_key: Hashable = None) -> Dict[str, Any]:
+        """
+        Returns the non-empty bins of one tile.
+
+        Args:
+            zoom (int): Zoom level in [0, max_zoom].
+            x (int): Tile column, counted from xmin.
+            y (int): Tile row, counted from ymin.
+            categories (Optional[np.ndarray]): Optional (N,) labels to split the
+                                               counts by; pass a stable `cache_key`
+                                               so the pyramid is reused.
+            cache_key (Hashable): Key under which the pyramid is cached.
+
+        Returns:
+            Dictionary with the tile's total count and, per category, the flat
+            bin indices (row * tile_size + column) and their counts.
+        """
+        if not 0 <= zoom <= self.max_zoom:
+            raise ValueError(f"zoom must be in the range [0, {self.max_zoom}].")
+        n_tiles = 2 ** zoom
+        if not (0 <= x < n_tiles and 0 <= y < n_tiles):
+            raise ValueError(f"Tile coordinates at zoom {zoom} must be in the range [0, {n_tiles}).")
+        if categories is not None and cache_key is None:
+            raise ValueError("A `cache_key` is required when splitting by categories.")
+
+        levels, category_values = self._pyramid(categories, cache_key)
+        keys, counts = levels[zoom]
+        bins_per_tile = self.tile_size ** 2
+        tile_offset = (y * n_tiles + x) * bins_per_tile
+
+        groups = []
+        total = 0
+        for code, value in enumerate(category_values):
+            start = code * self._level_size(zoom) + tile_offset
+            lo, hi = np.searchsorted(keys, [start, start + bins_per_tile])
+            if hi == lo:
+                continue
+            tile_counts = counts[lo:hi]
+            total += int(tile_counts.sum())
+            groups.append({
+                "category": value.item() if categories is not None else None,
+                "bins": (keys[lo:hi] - start).tolist(),
+                "counts": tile_counts.tolist()
+            })
+
+        return {
+            "zoom": zoom,
+            "x": x,
+            "y": y,
+            "tile_size": self.tile_size,
+            "bounds": self.tile_bounds(zoom, x, y),
+            "total": total,
+            "groups": groups
+        }
@@ -1,15 +1,30 @@
 # timelens/timelens_cli.py
 
 import argparse
-# Import the new server initialization function
-from timelens.server import init_server 
 import os
+import time
 
 def main():
     parser = argparse.ArgumentParser(description="Timelens: Visualize Time Series Data")
     parser.add_argument("pod_path", help="Path to the TSPod file (.npz)")
     parser.add_argument("--host", default="127.0.0.1", help="Host address (default: 127.0.0.1)")
     parser.add_argument("--port", type=int, default=5000, help="Port number (default: 5000)")
+    parser.add_argument("--mmap", action="store_true",
+                        help="Memory-map the series data instead of loading it into RAM (pod must be saved uncompressed)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Reload the pod without restarting when its file changes (e.g. after appending series)")
+    parser.add_argument("--watch-interval", type=float, default=2.0,
+                        help="Seconds between checks for pod changes (default: 2.0)")
+    parser.add_argument("--warm-up", action="store_true",
+                        help="Import heavy dependencies in the background once the server is listening")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report the import and load time breakdown during startup")
+    parser.add_argument("--profile-requests", type=float, metavar="SECONDS",
+                        help="Capture a cProfile profile of requests slower than SECONDS")
+    parser.add_argument("--profile-dir", default="timelens_profiles",
+                        help="Directory for slow-request profiles (default: timelens_profiles)")
+    parser.add_argument("--response-cache-mb", type=int, default=256,
+                        help="Memory for cached compressed /info and /data responses (default: 256)")
 
     args = parser.parse_args()
 
@@ -19,9 +34,20 @@ def main():
         return
 
     print(f"Starting Timelens server with pod: {args.pod_path}")
+
+    startup_timings = {} if args.profile_startup else None
+    start = time.perf_counter()
+    # Imported here so `timelens --help` and argument errors return without loading Flask
+    from timelens.server import init_server
+    if startup_timings is not None:
+        startup_timings["import server"] = time.perf_counter() - start
     
     # Call the new init_server function
-    init_server(args.pod_path, host=args.host, port=args.port)
+    init_server(args.pod_path, host=args.host, port=args.port, mmap=args.mmap,
+                watch=args.watch, watch_interval=args.watch_interval,
+                warm=args.warm_up, startup_timings=startup_timings,
+                profile_requests=args.profile_requests, profile_dir=args.profile_dir,
+                response_cache_bytes=args.response_cache_mb * 1024 ** 2)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,13 +1,63 @@
-from sklearn.decomposition import PCA
+import numpy as np
 
 
 # Projects multivariate time series of shape N, T, D to N, 2
 # 
 # First reshape the input to N, T*D, then project to N, 2
-def project_mts(X, reducer=None):
+# With return_reducer=True the fitted reducer is returned too, so new series
+# can later be placed with the same model (see extract_projection_model).
+def project_mts(X, reducer=None, return_reducer=False):
+    from sklearn.decomposition import PCA
+
     N, T, D = X.shape
     X = X.reshape(N, T*D)
     if reducer is None:
         reducer = PCA(n_components=2)
     reducer.fit(X)
-    return reducer.transform(X)
\ No newline at end of file
+    projection = reducer.transform(X)
+    return (projection, reducer) if return_reducer else projection
+
+
+# Extracts the arrays needed to re-apply a fitted linear projection (PCA or
+# IncrementalPCA) as a plain dictionary that can be stored in a pod.
+# Returns None for reducers without a linear model.
+def extract_projection_model(reducer):
+    if not hasattr(reducer, 'components_') or not hasattr(reducer, 'mean_'):
+        return None
+    return {'mean': np.asarray(reducer.mean_), 'components': np.asarray(reducer.components_)}
+
+
+# Places new series of shape N, T, D with a stored projection model
+# (the equivalent of reducer.transform without refitting).
+def apply_projection_model(X, model):
+    N, T, D = X.shape
+    X = np.asarray(X, dtype=np.float64).reshape(N, T*D)
+    return (X - model['mean']) @ model['components'].T
+
+
+# Splits the T axis of an (N, T, D) array into chunks so that reading `n_rows`
+# series for one chunk stays under `max_bytes` of float64 working memory.
+def time_chunks(n_rows, n_timesteps, n_dims, max_bytes=64 * 1024 ** 2):
+    bytes_per_step = max(1, n_rows * n_dims * 8)
+    step = int(max(1, min(n_timesteps, max_bytes // bytes_per_step)))
+    for start in range(0, n_timesteps, step):
+        yield slice(start, min(start + step, n_timesteps))
+
+
+# Incremental variant of project_mts for arrays that do not fit in memory
+# (e.g. memory-mapped pods): IncrementalPCA is fitted one block of series at
+# a time, then the projection is computed block by block.
+def project_mts_incremental(X, max_bytes=256 * 1024 ** 2, return_reducer=False):
+    from sklearn.decomposition import IncrementalPCA
+    from sklearn.utils import gen_batches
+
+    N, T, D = X.shape
+    batch_size = int(max(2, max_bytes // max(1, T * D * 8)))
+    reducer = IncrementalPCA(n_components=2)
+    for batch in gen_batches(N, batch_size, min_batch_size=2):
+        reducer.partial_fit(np.asarray(X[batch], dtype=np.float64).reshape(-1, T*D))
+
+    projection = np.empty((N, 2))
+    for batch in gen_batches(N, batch_size):
+        projection[batch] = reducer.transform(np.asarray(X[batch], dtype=np.float64).reshape(-1, T*D))
+    return (projection, reducer) if return_reducer else projection